@@ -0,0 +1,42 @@
+import hmac
+import os
+
+import pandas as pd
+import streamlit as st
+
+from metrics import reset, snapshot
+
+
+def admin_token():
+    """The admin token from SLBOOK_ADMIN_TOKEN or the `admin_token` secret, if configured."""
+    token = os.environ.get('SLBOOK_ADMIN_TOKEN')
+    if token:
+        return token
+    # Reading st.secrets without a secrets.toml puts an error box on the page
+    if not st.secrets.load_if_toml_exists():
+        return None
+    return st.secrets.get('admin_token')
+
+
+def is_admin():
+    """True when the page was opened with ?admin=<token>; admin views stay hidden otherwise."""
+    token = admin_token()
+    supplied = st.query_params.get('admin')
+    return bool(token and supplied and hmac.compare_digest(str(token), supplied))
+
+
+def metrics_panel():
+    """Per-operation timings and counters of this server process, for admins only."""
+    if not is_admin():
+        return
+
+    with st.expander('Metrics'):
+        data = snapshot()
+        rows = [{'span': name, **{k: v for k, v in stats.items() if k != 'histogram'}}
+                for name, stats in sorted(data['spans'].items())]
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        st.json(data, expanded=False)
+        if st.button('Reset metrics'):
+            reset()
+            st.rerun()
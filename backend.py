@@ -1,20 +1,12 @@
 import streamlit as st
-import sqlite3
 from datetime import datetime
 
-# Function to create SQLite database table for appointments
+from bookings import BOOKINGS_DB, book_slot
+from migrations import ensure_schema
+
+# Function to bring the SQLite databases to the current schema (once per process)
 def create_table():
-    conn = sqlite3.connect('slot_booking_new.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS appointment_bookings
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 date TEXT,
-                 time_range TEXT,
-                 manager TEXT,
-                 spoc TEXT,
-                 booked_by TEXT)''')
-    conn.commit()
-    conn.close()
+    ensure_schema(BOOKINGS_DB)
 
 # Function to insert booking into SQLite database
 def insert_booking(date, time_range, manager, spoc, booked_by):
@@ -24,22 +16,11 @@ def insert_booking(date, time_range, manager, spoc, booked_by):
         st.error('Slot booking failed. You must provide your name in the "Slot Booked By" field.')
         return
 
-    conn = sqlite3.connect('slot_booking_new.db')
-    c = conn.cursor()
-
-    c.execute('''SELECT * FROM appointment_bookings 
-                 WHERE date = ? AND spoc = ?''', (date, spoc))
-    existing_booking = c.fetchone()
-
-    if existing_booking:
-        conn.close()
+    # The unique (date, spoc) index rejects double bookings, even from simultaneous clicks
+    if not book_slot(date, time_range, manager, spoc, booked_by):
         st.error('Slot booking failed. This SPOC is already booked for the selected date.')
         return
 
-    c.execute('''INSERT INTO appointment_bookings (date, time_range, manager, spoc, booked_by)
-                 VALUES (?, ?, ?, ?, ?)''', (date, time_range, manager, spoc, booked_by))
-    conn.commit()
-    conn.close()
     st.success('Slot booked successfully!')
 
 # Main function for the Streamlit app
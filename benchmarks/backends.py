@@ -0,0 +1,180 @@
+"""Time the same store operations on every storage backend, side by side.
+
+Run from the repository root:
+
+    python -m benchmarks.backends --backends sqlite sheets memory --scales 10000 100000 --out backend_results.json
+
+Each (backend, scale) runs in a fresh temporary directory seeded with `scale` bookings and
+students. The Sheets backend talks to the in-process fake_gspread stand-in; pass
+--sheets-latency-ms to charge each of its API requests a simulated round-trip.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+import fake_gspread
+import sheets_client
+import storage
+from benchmarks import synthetic
+from benchmarks.hot_paths import _drop_caches, _timed, environment
+from benchmarks.rerun_latency import SPREADSHEET_URL, seed_sheets, seed_sqlite
+from db import get_pool
+from validation import keep_valid_rows
+
+DEFAULT_BACKENDS = tuple(storage.BACKENDS)
+DEFAULT_SCALES = (10_000,)
+BOOKING_INSERTS = 200
+
+
+def _seed_memory(backend, n_bookings, n_students):
+    for row in synthetic.bookings(n_bookings).itertuples(index=False):
+        backend.bookings.book(*row)
+    synthetic.write_xlsx(synthetic.students(n_students, seed=1), 'seed.xlsx')
+    with open('seed.xlsx', 'rb') as f:
+        backend.students.ingest(f)
+
+
+def make_backend(name, n):
+    """A freshly seeded backend in the current directory."""
+    if name == 'sqlite':
+        seed_sqlite(n, n)
+        return storage.sqlite_backend()
+    if name == 'sheets':
+        fake_gspread.reset()
+        sheets_client.forget_syncs()
+        sheets_client.forget_handles()
+        seed_sheets(n, n)
+        client = fake_gspread.FakeClient()
+        return storage.sheets_backend(lambda name: sheets_client.open_worksheet(name, client, SPREADSHEET_URL),
+                                      sheets_client.batch_getter(client, SPREADSHEET_URL))
+    backend = storage.memory_backend()
+    _seed_memory(backend, n, n)
+    return backend
+
+
+def bench_book(backend, n, repeat):
+    day = date.today() + timedelta(days=1)
+    calls = iter(range(10 ** 9))
+
+    def run():
+        for _ in range(BOOKING_INSERTS):
+            i = next(calls)
+            backend.bookings.book(str(day + timedelta(days=i // 50)), synthetic.TIME_RANGES[0], 'Manager X',
+                                  f'Bench SPOC {i % 50}', 'bench')
+
+    return _timed(run, repeat), BOOKING_INSERTS
+
+
+def bench_month_query(backend, n, repeat):
+    now = datetime.now()
+    return _timed(lambda: backend.bookings.bookings_in_month(now.year, now.month), repeat), n
+
+
+def bench_day_query(backend, n, repeat):
+    today = date.today()
+    return _timed(lambda: backend.bookings.bookings_on(today), repeat), n
+
+
+def bench_cold_page(backend, n, repeat):
+    """What a page render reads, with every cache dropped first (for Sheets: a cold mirror sync)."""
+    now = datetime.now()
+
+    def run():
+        _drop_caches()
+        sheets_client.forget_syncs()
+        backend.prefetch()
+        backend.bookings.bookings_in_month(now.year, now.month)
+        backend.bookings.bookings_on(now.date())
+
+    return _timed(run, repeat), n
+
+
+def bench_ingest(backend, n, repeat):
+    def run():
+        with open('upload.xlsx', 'rb') as f:
+            backend.students.ingest(f, keep=keep_valid_rows)
+
+    return _timed(run, repeat), n
+
+
+def bench_export_students(backend, n, repeat):
+    def run():
+        out, _ = backend.students.export_csv()
+        out.close()
+
+    return _timed(run, repeat), n
+
+
+def bench_export_bookings(backend, n, repeat):
+    def run():
+        out, _ = backend.bookings.export_csv()
+        out.close()
+
+    return _timed(run, repeat), n
+
+
+OPERATIONS = {
+    'book': bench_book,
+    'month_query': bench_month_query,
+    'day_query': bench_day_query,
+    'cold_page': bench_cold_page,
+    'ingest': bench_ingest,
+    'export_students': bench_export_students,
+    'export_bookings': bench_export_bookings,
+}
+
+
+def run_backend(name, n, operations, repeat):
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='slbook_backend_') as workdir:
+        os.chdir(workdir)
+        try:
+            synthetic.write_ids_xlsx(n // 2, 'ids.xlsx')
+            synthetic.write_xlsx(synthetic.students(n, seed=2), 'upload.xlsx')
+            _drop_caches()
+            backend = make_backend(name, n)
+            for operation in operations:
+                seconds, rows = OPERATIONS[operation](backend, n, repeat)
+                results.append({
+                    'backend': name,
+                    'operation': operation,
+                    'scale': n,
+                    'rows': rows,
+                    'repeat': len(seconds),
+                    'min_s': min(seconds),
+                    'median_s': statistics.median(seconds),
+                    'max_s': max(seconds),
+                })
+                print(f'{name:<8} {operation:<16} n={n:<9} median {statistics.median(seconds) * 1000:10.1f} ms',
+                      file=sys.stderr)
+        finally:
+            get_pool().close_all()
+            os.chdir(cwd)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', choices=list(storage.BACKENDS), default=DEFAULT_BACKENDS)
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES)
+    parser.add_argument('--only', nargs='+', choices=list(OPERATIONS), default=list(OPERATIONS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sheets-latency-ms', type=float, default=0)
+    parser.add_argument('--out', default='backend_results.json')
+    args = parser.parse_args(argv)
+
+    fake_gspread.configure(latency_ms=args.sheets_latency_ms)
+    results = [record for n in args.scales for name in args.backends
+               for record in run_backend(name, n, args.only, args.repeat)]
+    with open(args.out, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    print(f'Wrote {len(results)} results to {args.out}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
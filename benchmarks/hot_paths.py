@@ -0,0 +1,219 @@
+"""Time the booking, upload, calendar, delete and export hot paths on synthetic data.
+
+Run from the repository root:
+
+    python -m benchmarks.hot_paths --scales 10000 100000 1000000 --out bench_results.json
+
+Every scale runs in a fresh temporary directory, so the working databases are never touched.
+Results are written as JSON, one record per (benchmark, scale).
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+import bookings
+import validation
+from benchmarks import synthetic
+from bookings import BOOKINGS_DB, book_slot, bookings_in_month
+from calendar_view import generate_calendar, month_calendar_html
+from db import connection, get_pool
+from exports import write_csv
+from migrations import ensure_schema
+from storage import SQLiteStudentStore
+from students import PLANA_COLUMNS, delete_students, insert_students
+
+DEFAULT_SCALES = (10_000, 100_000)
+BOOKING_INSERTS = 200   # single bookings timed against a table of `scale` rows
+
+
+def _timed(call, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def _drop_caches():
+    bookings._cache.clear()
+    validation._loaded.clear()
+    month_calendar_html.cache_clear()
+
+
+def prepare(n):
+    """Fill the working directory with `n` bookings, `n` plana rows and the upload inputs."""
+    with connection(BOOKINGS_DB) as conn:
+        synthetic.bookings(n).to_sql('appointment_bookings', conn, if_exists='append', index=False)
+    with connection('Plana.db') as conn:
+        insert_students(conn, 'plana', synthetic.students(n, seed=1), PLANA_COLUMNS)
+    synthetic.write_ids_xlsx(n // 2, 'ids.xlsx')
+    synthetic.write_xlsx(synthetic.students(n, seed=2), 'upload.xlsx')
+
+
+def bench_book_slot(n, repeat):
+    day = date.today() + timedelta(days=1)
+    calls = iter(range(10 ** 9))
+
+    def run():
+        for _ in range(BOOKING_INSERTS):
+            i = next(calls)
+            book_slot(str(day + timedelta(days=i // 50)), synthetic.TIME_RANGES[0], 'Manager X', f'Bench SPOC {i % 50}', 'bench')
+
+    return _timed(run, repeat), BOOKING_INSERTS
+
+
+def bench_calendar_month_query(n, repeat):
+    now = datetime.now()
+
+    def run():
+        _drop_caches()
+        generate_calendar(bookings_in_month(now.year, now.month), now)
+
+    return _timed(run, repeat), n
+
+
+def bench_calendar_cached_rerun(n, repeat):
+    now = datetime.now()
+    generate_calendar(bookings_in_month(now.year, now.month), now)
+    return _timed(lambda: generate_calendar(bookings_in_month(now.year, now.month), now), repeat), n
+
+
+def bench_calendar_full_table(n, repeat):
+    """The old main() path: read every booking, then build the calendar from the whole table."""
+    def run():
+        month_calendar_html.cache_clear()
+        with connection(BOOKINGS_DB) as conn:
+            frame = pd.read_sql_query('SELECT * FROM appointment_bookings', conn)
+        frame['date'] = pd.to_datetime(frame['date'])
+        generate_calendar(frame)
+
+    return _timed(run, repeat), n
+
+
+def bench_validation_index(n, repeat):
+    def run():
+        validation._loaded.clear()
+        if os.path.exists(validation.INDEX_DB):
+            get_pool().close_all()
+            os.remove(validation.INDEX_DB)
+        validation.valid_ids('ids.xlsx')
+
+    return _timed(run, repeat), n // 2
+
+
+def bench_upload_ingest(n, repeat):
+    """update_another_database in app.py: stream upload.xlsx and keep rows found in ids.xlsx."""
+    def keep(batch):
+        batch['CMIS ID'] = validation.clean_id_series(batch['CMIS ID'])
+        return batch[validation.valid_id_mask(batch['CMIS ID'])]
+
+    def run():
+        with open('upload.xlsx', 'rb') as f:
+            SQLiteStudentStore('Plana.db', 'plana_upload').ingest(f, keep=keep)
+
+    with connection('Plana.db') as conn:
+        conn.execute('CREATE TABLE IF NOT EXISTS plana_upload AS SELECT * FROM plana WHERE 0')
+    return _timed(run, repeat), n
+
+
+def bench_bulk_delete(n, repeat):
+    """Delete 10% of the plana rows by CMIS ID; the rows are restored outside the timing."""
+    ids = [synthetic.cmis_id(i) for i in range(0, n, 10)]
+    seconds = []
+    for _ in range(repeat):
+        with connection('Plana.db') as conn:
+            conn.execute('DROP TABLE IF EXISTS plana_backup')
+            conn.execute('CREATE TABLE plana_backup AS SELECT * FROM plana')
+        start = time.perf_counter()
+        with connection('Plana.db') as conn:
+            delete_students(conn, 'plana', ids)
+        seconds.append(time.perf_counter() - start)
+        with connection('Plana.db') as conn:
+            conn.execute('DELETE FROM plana')
+            conn.execute('INSERT INTO plana SELECT * FROM plana_backup')
+    return seconds, len(ids)
+
+
+def bench_csv_export(n, repeat):
+    def run():
+        with tempfile.TemporaryFile() as out:
+            write_csv(out, 'Plana.db', 'SELECT * FROM plana')
+
+    return _timed(run, repeat), n
+
+
+BENCHMARKS = {
+    'book_slot': bench_book_slot,
+    'calendar_month_query': bench_calendar_month_query,
+    'calendar_cached_rerun': bench_calendar_cached_rerun,
+    'calendar_full_table': bench_calendar_full_table,
+    'validation_index': bench_validation_index,
+    'upload_ingest': bench_upload_ingest,
+    'bulk_delete': bench_bulk_delete,
+    'csv_export': bench_csv_export,
+}
+
+
+def run_scale(n, names, repeat):
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='slbook_bench_') as workdir:
+        os.chdir(workdir)
+        try:
+            ensure_schema('Plana.db', BOOKINGS_DB)
+            prepare(n)
+            for name in names:
+                _drop_caches()
+                seconds, rows = BENCHMARKS[name](n, repeat)
+                results.append({
+                    'benchmark': name,
+                    'scale': n,
+                    'rows': rows,
+                    'repeat': len(seconds),
+                    'min_s': min(seconds),
+                    'median_s': statistics.median(seconds),
+                    'max_s': max(seconds),
+                })
+                print(f'{name:<24} n={n:<9} median {statistics.median(seconds) * 1000:10.1f} ms', file=sys.stderr)
+        finally:
+            get_pool().close_all()
+            os.chdir(cwd)
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sqlite': sqlite3.sqlite_version,
+        'pandas': pd.__version__,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', default='bench_results.json')
+    args = parser.parse_args(argv)
+
+    results = [record for n in args.scales for record in run_scale(n, args.only, args.repeat)]
+    with open(args.out, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    print(f'Wrote {len(results)} results to {args.out}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
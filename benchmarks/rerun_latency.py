@@ -0,0 +1,214 @@
+"""Measure full-script rerun latency of the apps with Streamlit's AppTest.
+
+Run from the repository root:
+
+    python -m benchmarks.rerun_latency --apps app.py chen.py r.py --bookings 100000 --out rerun_results.json
+
+Each app runs in a fresh temporary directory seeded with synthetic data. chen.py is pointed
+at the in-process fake_gspread stand-in, so no Google credentials or network are needed.
+Every scenario is a scripted interaction; each interaction is one rerun, and the report gives
+p50/p95 latency plus the tracemalloc peak of one extra, traced pass. `first_load_no_secrets`
+starts the app without any secrets, as a SQLite deployment without a secrets.toml runs;
+apps in NEEDS_SECRETS skip it.
+
+AppTest in Streamlit 1.36 cannot drive st.file_uploader. Upload scenarios are therefore not
+part of this harness; benchmarks.hot_paths times the ingest path directly.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+import fake_gspread
+import sheets_client
+from benchmarks import synthetic
+from benchmarks.hot_paths import environment
+from bookings import BOOKINGS_DB
+from db import connection, get_pool
+from migrations import ensure_schema
+from students import PLANA_COLUMNS, insert_students
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPREADSHEET_URL = 'https://docs.google.com/spreadsheets/d/local-benchmark'
+DEFAULT_APPS = ('app.py', 'chen.py', 'r.py')
+NEEDS_SECRETS = ('chen.py',)   # cannot start without the spreadsheet URL secret
+APP_TIMEOUT = 120
+
+
+def seed_sqlite(n_bookings, n_students):
+    ensure_schema(BOOKINGS_DB, 'Plana.db', 'slide.db')
+    with connection(BOOKINGS_DB) as conn:
+        synthetic.bookings(n_bookings).to_sql('appointment_bookings', conn, if_exists='append', index=False)
+    with connection('Plana.db') as conn:
+        insert_students(conn, 'plana', synthetic.students(n_students, seed=1), PLANA_COLUMNS)
+    with connection('slide.db') as conn:
+        insert_students(conn, 'bani', synthetic.students(n_students, seed=1), PLANA_COLUMNS)
+
+
+def seed_sheets(n_bookings, n_students):
+    spreadsheet = fake_gspread.open_spreadsheet(SPREADSHEET_URL)
+    bookings = synthetic.bookings(n_bookings)
+    ws = spreadsheet.add_worksheet('slot_booking_new', rows=n_bookings + 1, cols=6)
+    ws.append_rows([['id', *bookings.columns]] + [[i + 1, *row] for i, row in enumerate(bookings.itertuples(index=False))])
+    students = synthetic.students(n_students, seed=1)
+    ws = spreadsheet.add_worksheet('plana', rows=n_students + 1, cols=9)
+    ws.append_rows([['id', *PLANA_COLUMNS.values()]] + [[i + 1, *row] for i, row in enumerate(students.itertuples(index=False))])
+
+
+def _button(at, label):
+    for button in at.button:
+        if button.label == label:
+            return button
+    return None
+
+
+def _new_app(script, secrets=True):
+    at = AppTest.from_file(os.path.join(REPO_ROOT, script), default_timeout=APP_TIMEOUT)
+    if secrets:
+        at.secrets['connections'] = {'gsheets': {'spreadsheet': SPREADSHEET_URL}}
+    return at
+
+
+# Each scenario yields the app once per rerun it wants; the harness runs, times and checks it
+def scenario_first_load(script, at, i):
+    yield _new_app(script)
+
+
+def scenario_first_load_no_secrets(script, at, i):
+    if script not in NEEDS_SECRETS:
+        yield _new_app(script, secrets=False)
+
+
+def scenario_select_manager(script, at, i):
+    options = at.selectbox[0].options
+    at.selectbox[0].set_value(options[i % len(options)])
+    yield at
+
+
+def scenario_type_booked_by(script, at, i):
+    at.text_input[0].input(f'bench user {i}')
+    yield at
+
+
+def scenario_book_slot(script, at, i):
+    at.session_state['data_uploaded'] = True
+    at.date_input[0].set_value(date.today() + timedelta(days=30 + i))
+    at.text_input[0].input(f'bench user {i}')
+    yield at
+    button = _button(at, 'Book Slot')
+    if button is not None:
+        button.click()
+        yield at
+
+
+def scenario_download(script, at, i):
+    button = _button(at, 'Download Data For M&E Purpose')
+    if button is None:
+        return   # this page has no separate download step
+    button.click()
+    yield at
+
+
+SCENARIOS = {
+    'first_load': scenario_first_load,
+    'first_load_no_secrets': scenario_first_load_no_secrets,
+    'select_manager': scenario_select_manager,
+    'type_booked_by': scenario_type_booked_by,
+    'book_slot': scenario_book_slot,
+    'download': scenario_download,
+}
+
+
+def _run_scenario(script, at, name, i):
+    """Play one iteration of a scenario; return the rerun latencies in seconds."""
+    latencies = []
+    for app in SCENARIOS[name](script, at, i):
+        start = time.perf_counter()
+        app.run()
+        latencies.append(time.perf_counter() - start)
+        if app.exception:
+            raise RuntimeError(f'{script} raised during {name}: {app.exception[0].value}')
+        # Streamlit reports a missing secrets.toml as an error box, not an exception
+        errors = [error.value for error in app.error if 'secrets' in error.value]
+        if errors:
+            raise RuntimeError(f'{script} showed a secrets error during {name}: {errors[0]}')
+    return latencies
+
+
+def bench_app(script, scenarios, iterations):
+    at = _new_app(script)
+    at.run()   # warm imports and process-wide caches once, as a long-running server would have
+    results = []
+    for name in scenarios:
+        latencies = [t for i in range(iterations) for t in _run_scenario(script, at, name, i)]
+        if not latencies:
+            continue
+
+        tracemalloc.start()
+        _run_scenario(script, at, name, iterations)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results.append({
+            'app': script,
+            'scenario': name,
+            'reruns': len(latencies),
+            'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+            'p95_ms': float(np.percentile(latencies, 95)) * 1000,
+            'max_ms': max(latencies) * 1000,
+            'peak_traced_mib': peak / 2 ** 20,
+        })
+        print(f'{script:<10} {name:<16} p50 {results[-1]["p50_ms"]:8.1f} ms  p95 {results[-1]["p95_ms"]:8.1f} ms  '
+              f'peak {results[-1]["peak_traced_mib"]:7.1f} MiB', file=sys.stderr)
+    return results
+
+
+def run_app(script, scenarios, iterations, n_bookings, n_students):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='slbook_rerun_') as workdir:
+        os.chdir(workdir)
+        try:
+            synthetic.write_xlsx(synthetic.managers_spocs(), 'managers_spocs.xlsx')
+            synthetic.write_ids_xlsx(n_students, 'ids.xlsx')
+            seed_sqlite(n_bookings, n_students)
+            fake_gspread.reset()
+            sheets_client.forget_syncs()
+            sheets_client.forget_handles()
+            seed_sheets(n_bookings, n_students)
+            return bench_app(script, scenarios, iterations)
+        finally:
+            get_pool().close_all()
+            os.chdir(cwd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--apps', nargs='+', default=DEFAULT_APPS)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--bookings', type=int, default=10_000)
+    parser.add_argument('--students', type=int, default=10_000)
+    parser.add_argument('--out', default='rerun_results.json')
+    args = parser.parse_args(argv)
+
+    os.environ['SLBOOK_FAKE_SHEETS'] = '1'
+    results = [record for script in args.apps
+               for record in run_app(script, args.scenarios, args.iterations, args.bookings, args.students)]
+    report = {
+        'environment': {**environment(), 'bookings': args.bookings, 'students': args.students},
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {len(results)} results to {args.out}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
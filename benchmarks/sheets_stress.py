@@ -0,0 +1,159 @@
+"""Stress the Google Sheets backend against fake_gspread with latency, quota and row limits.
+
+Run from the repository root:
+
+    python -m benchmarks.sheets_stress --sessions 20 --bookings 5 --uploads 2 \\
+        --latency-ms 150 --jitter-ms 50 --quota-per-minute 300 --out sheets_stress.json
+
+`sessions` threads each book `bookings` slots while `uploads` threads push a synthetic
+student workbook through the same store the app uses. Every session also tries to book one
+shared (date, SPOC) pair, so `double_bookings` shows whether the duplicate check holds
+under contention. Quota errors are retried with the app's backoff (sheets.with_backoff).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+import fake_gspread
+import metrics
+import sheets_client
+import storage
+from benchmarks import synthetic
+from benchmarks.hot_paths import environment
+from benchmarks.rerun_latency import SPREADSHEET_URL, seed_sheets
+from db import get_pool
+
+CONTENDED_SPOC = 'Contended SPOC'
+
+
+class _Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = Counter()
+        self._lock = threading.Lock()
+
+    def call(self, operation, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        except Exception as exc:
+            with self._lock:
+                self.errors[f'{operation}: {type(exc).__name__}: {exc}'[:200]] += 1
+            return None
+        finally:
+            with self._lock:
+                self.latencies.setdefault(operation, []).append(time.perf_counter() - start)
+
+    def summary(self):
+        return {operation: {'calls': len(seconds),
+                            'p50_ms': float(np.percentile(seconds, 50)) * 1000,
+                            'p95_ms': float(np.percentile(seconds, 95)) * 1000,
+                            'max_ms': max(seconds) * 1000}
+                for operation, seconds in self.latencies.items()}
+
+
+def session(backend, recorder, index, n_bookings, contended_day):
+    booked = recorder.call('book_contended', backend.bookings.book, str(contended_day), synthetic.TIME_RANGES[0],
+                           'Manager X', CONTENDED_SPOC, f'session {index}')
+    first_day = contended_day + timedelta(days=1)
+    for i in range(n_bookings):
+        recorder.call('book', backend.bookings.book, str(first_day + timedelta(days=i)), synthetic.TIME_RANGES[1],
+                      'Manager X', f'Stress SPOC {index}', f'session {index}')
+        recorder.call('month_query', backend.bookings.bookings_in_month, first_day.year, first_day.month)
+    return bool(booked)
+
+
+def upload(backend, recorder, path):
+    with open(path, 'rb') as f:
+        return recorder.call('upload', backend.students.ingest, f)
+
+
+def run(args):
+    fake_gspread.reset()
+    sheets_client.forget_syncs()
+    sheets_client.forget_handles()
+    metrics.reset()
+    fake_gspread.configure(latency_ms=0, jitter_ms=0, quota_per_minute=0, max_rows=0)
+    seed_sheets(args.seed_bookings, args.seed_students)
+    synthetic.write_xlsx(synthetic.students(args.upload_rows, seed=3), 'stress_upload.xlsx')
+
+    fake_gspread.reset_stats()
+    fake_gspread.configure(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           quota_per_minute=args.quota_per_minute, max_rows=args.max_rows)
+    client = fake_gspread.FakeClient()
+    # Worksheet handles are cached as in sheets_client.get_worksheet
+    backend = storage.sheets_backend(lambda name: sheets_client.open_worksheet(name, client, SPREADSHEET_URL),
+                                     sheets_client.batch_getter(client, SPREADSHEET_URL))
+    recorder = _Recorder()
+    contended_day = date.today() + timedelta(days=400)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions + args.uploads) as pool:
+        sessions = [pool.submit(session, backend, recorder, i, args.bookings, contended_day)
+                    for i in range(args.sessions)]
+        uploads = [pool.submit(upload, backend, recorder, 'stress_upload.xlsx') for _ in range(args.uploads)]
+        contended_wins = sum(future.result() for future in sessions)
+        for future in uploads:
+            future.result()
+    wall = time.perf_counter() - start
+    api = fake_gspread.request_stats()
+
+    fake_gspread.configure(latency_ms=0, jitter_ms=0, quota_per_minute=0)
+    rows = fake_gspread.open_spreadsheet(SPREADSHEET_URL).worksheet('slot_booking_new').get_all_values()
+    stored_contended = sum(1 for row in rows[1:] if row[1] == str(contended_day) and row[4] == CONTENDED_SPOC)
+    return {
+        'wall_s': wall,
+        'operations': recorder.summary(),
+        'errors': dict(recorder.errors),
+        'contended_wins': contended_wins,
+        'double_bookings': max(0, stored_contended - 1),
+        'api': api,
+        'retries': metrics.snapshot()['counters'].get('sheets.retries', 0),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--bookings', type=int, default=5, help='bookings per session')
+    parser.add_argument('--uploads', type=int, default=1)
+    parser.add_argument('--upload-rows', type=int, default=2000)
+    parser.add_argument('--seed-bookings', type=int, default=10_000)
+    parser.add_argument('--seed-students', type=int, default=10_000)
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--jitter-ms', type=float, default=30)
+    parser.add_argument('--quota-per-minute', type=int, default=300)
+    parser.add_argument('--max-rows', type=int, default=0)
+    parser.add_argument('--out', default='sheets_stress.json')
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='slbook_stress_') as workdir:
+        os.chdir(workdir)
+        try:
+            result = run(args)
+        finally:
+            get_pool().close_all()
+            os.chdir(cwd)
+
+    for operation, stats in result['operations'].items():
+        print(f"{operation:<16} calls {stats['calls']:5d}  p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms",
+              file=sys.stderr)
+    print(f"wall {result['wall_s']:.1f} s, API requests {sum(result['api']['requests'].values())}, "
+          f"rejected {result['api']['rejected']}, retries {result['retries']}, "
+          f"double bookings {result['double_bookings']}, errors {sum(result['errors'].values())}", file=sys.stderr)
+    with open(args.out, 'w') as f:
+        json.dump({'environment': environment(), 'settings': vars(args), **result}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Synthetic data in the shapes the apps read: bookings, manager/SPOC lists, ids.xlsx and upload workbooks."""
+import random
+from datetime import date, timedelta
+
+import openpyxl
+import pandas as pd
+
+from students import STUDENT_COLUMNS
+
+TIME_RANGES = ['10:00 AM - 11:00 AM', '11:00 AM - 12:00 PM', '12:00 PM - 1:00 PM', '2:00 PM - 3:00 PM', '3:00 PM - 4:00 PM']
+VERIFICATION_TYPES = ['Placement', 'Enrollment']
+MODES = ['G-meet', 'Call']
+BOOKING_DAYS = 3650   # bookings are spread over ten years ending today
+
+
+def cmis_id(n):
+    return f'AF{n:07d}'
+
+
+def managers_spocs(n_managers=20, spocs_per_manager=3, seed=0):
+    """managers_spocs.xlsx as a DataFrame: 'Manager Name', 'SPOC Name'."""
+    rng = random.Random(seed)
+    rows = [(f'Manager {m}', f'SPOC {m}-{s}') for m in range(n_managers) for s in range(spocs_per_manager)]
+    rng.shuffle(rows)
+    return pd.DataFrame(rows, columns=['Manager Name', 'SPOC Name'])
+
+
+def bookings(n, seed=0, today=None):
+    """`n` appointment_bookings rows with unique (date, spoc) pairs, newest dates most frequent."""
+    rng = random.Random(seed)
+    today = today or date.today()
+    n_spocs = max(60, -(-n // BOOKING_DAYS) + 1)
+    # Walk (day, spoc) pairs from today backwards so every month up to today is populated
+    pairs = ((today - timedelta(days=i // n_spocs), i % n_spocs) for i in range(n))
+    rows = [(str(day), rng.choice(TIME_RANGES), f'Manager {spoc // 3}', f'SPOC {spoc // 3}-{spoc % 3}', f'user{rng.randrange(500)}')
+            for day, spoc in pairs]
+    return pd.DataFrame(rows, columns=['date', 'time_range', 'manager', 'spoc', 'booked_by'])
+
+
+def students(n, seed=0, id_offset=0):
+    """Upload rows with the Sample_Excel.xlsx headers (plus 'Verification Date')."""
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365)
+    rows = [(cmis_id(id_offset + i),
+             f'Student {id_offset + i}',
+             str(rng.randrange(6_000_000_000, 9_999_999_999)),
+             f'Center {rng.randrange(200)}',
+             f'Uploader {rng.randrange(50)}',
+             rng.choice(VERIFICATION_TYPES),
+             rng.choice(MODES),
+             (start + timedelta(days=rng.randrange(365))).strftime('%d-%m-%Y'))
+            for i in range(n)]
+    return pd.DataFrame(rows, columns=[*STUDENT_COLUMNS, 'Verification Date'])
+
+
+def write_xlsx(df, path, sheet_name='Sheet1'):
+    """Write `df` with openpyxl's write-only mode; pandas' writer is too slow at 10^6 rows."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        ws.append(row)
+    wb.save(path)
+
+
+def write_ids_xlsx(n, path):
+    """ids.xlsx with `n` CMIS_IDs, every other one matching students(2 * n)."""
+    write_xlsx(pd.DataFrame({'CMIS_ID': [cmis_id(2 * i) for i in range(n)]}), path)
@@ -0,0 +1,176 @@
+"""The slot booking page, the same for every storage backend (see storage.py).
+
+    streamlit run booking_page.py    # backend from SLBOOK_BACKEND or the `backend` secret
+
+app.py runs it on SQLite and chen.py on Google Sheets.
+"""
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+from admin import metrics_panel
+from calendar_view import generate_calendar
+from exports import file_download_button
+from metrics import span
+from profiling import maybe_profile, profiles_panel
+from storage import get_backend
+from upload_jobs import show_upload_progress, submit_upload
+from validation import clean_id_series, keep_valid_rows, valid_id_mask
+
+TIME_RANGES = ['10:00 AM - 11:00 AM', '11:00 AM - 12:00 PM', '12:00 PM - 1:00 PM', '2:00 PM - 3:00 PM', '3:00 PM - 4:00 PM']
+HOLIDAYS = ['2024-31-10', '2024-09-11', '2024-09-16']
+
+SAMPLE_DATA = {
+    'CMIS ID': ['123', '456', '789'],
+    'Student Name': ['John Doe', 'Jane Smith', 'Jim Beam'],
+    'CMIS PH No(10 Number)': ['1234567890', '0987654321', '1122334455'],
+    'Center Name': ['Center 1', 'Center 2', 'Center 3'],
+    'Name Of Uploder': ['Uploader 1', 'Uploader 2', 'Uploader 3'],
+    'Verification Type': ['Placement', 'Placement', 'Enrollment'],
+    'Mode Of Verification': ['G-meet', 'Call', 'Call'],
+    'Verification Date': ['28-02-2025', '28-02-2025', '28-02-2025']
+}
+
+
+# --- BOOKING FUNCTION ---
+def insert_booking(store, date, time_range, manager, spoc, booked_by):
+    if not booked_by:
+        st.error('Slot booking failed. You must provide your name in the "Slot Booked By" field.')
+        return
+
+    selected_date = datetime.strptime(date, '%Y-%m-%d')
+    current_date = datetime.now()
+
+    if selected_date.strftime('%Y-%m-%d') in HOLIDAYS:
+        st.error('Booking Closed')
+        return
+
+    if selected_date < current_date:
+        st.error('Slot booking failed. You cannot book slots for past dates.')
+        return
+
+    if selected_date.weekday() == 6:
+        st.error('If Error Message Reflects Or To Book Slot On Holidays & Other Than Official Hours Please Contact To Pritam Basu & Kousik Dey.')
+        return
+
+    with st.spinner("Processing your booking..."):
+        booked = store.book(date, time_range, manager, spoc, booked_by)
+    if not booked:
+        st.error('Slot booking failed. This SPOC is already booked for the selected date.')
+        return
+
+    st.session_state['last_action_msg'] = f"✅ Slot booked successfully for {spoc} on {date} ({time_range})!"
+    st.rerun()
+
+
+# --- UPLOAD FUNCTION ---
+# Only rows whose CMIS ID is in ids.xlsx are stored
+def update_another_database(store, file):
+    # Each batch is filtered against ids.xlsx and stored as soon as it is read
+    st.query_params['upload_job'] = submit_upload(file, store, keep=keep_valid_rows)
+
+
+# --- DOWNLOADS ---
+@lru_cache(maxsize=1)
+def sample_excel():
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        pd.DataFrame(SAMPLE_DATA).to_excel(writer, index=False, sheet_name='Sheet1')
+    return output.getvalue()
+
+def download_verified_data(store):
+    def keep_valid_ids(chunk):
+        chunk['cmis_id'] = clean_id_series(chunk['cmis_id'])
+        return chunk[valid_id_mask(chunk['cmis_id'])]
+
+    file_download_button('Download CSV', *store.export_csv(keep_valid_ids), 'plana_filtered.csv',
+                         empty_message="No valid data found for M&E verification.")
+
+def download_monthly_data(store):
+    file_download_button('Download CSV', *store.export_csv(), 'monthly_bookings.csv')
+
+
+# --- MAIN PAGE ---
+def main(backend=None):
+    backend = backend or get_backend()
+    backend.prefetch()
+    st.title('Slot Booking Platform')
+
+    # Persistent success banner across the rerun that follows a booking
+    if 'last_action_msg' in st.session_state:
+        st.success(st.session_state['last_action_msg'])
+        del st.session_state['last_action_msg']
+
+    directory = backend.directory()
+
+    selected_manager = st.selectbox('Select Manager', directory.managers)
+    selected_spoc = st.selectbox('Select SPOC', directory.spocs(selected_manager))
+
+    selected_date = st.date_input('Select Date')
+    selected_time_range = st.selectbox('Select Time', TIME_RANGES)
+    booked_by = st.text_input('Slot Booked By')
+
+    st.subheader('Upload Student Data For SPOC Calling')
+    st.markdown('**Please ensure that only student data marked as Not Joined or Not Contacted from the M&E database is included.**')
+
+    file = st.file_uploader('Upload Excel', type=['xlsx', 'xls'])
+    if file is not None:
+        if st.button('Update Data', use_container_width=True):
+            update_another_database(backend.students, file)
+    # Set once an upload job has finished with valid rows
+    show_upload_progress()
+    data_uploaded = st.session_state.get('data_uploaded', False)
+
+    if not data_uploaded:
+        st.warning('Please upload student data before booking a slot.')
+    else:
+        if st.button('Book Slot', type="primary", use_container_width=True):
+            insert_booking(backend.bookings, str(selected_date), selected_time_range, selected_manager, selected_spoc, booked_by)
+
+    # Exports are only built when asked for, not on every rerun
+    st.subheader('Data Operations & Formats')
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.download_button(
+            label="📋 Download Sample Format",
+            data=sample_excel(),
+            file_name="Sample_Excel.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            use_container_width=True
+        )
+
+    with col2:
+        if st.button('Download Data For M&E Purpose', use_container_width=True):
+            download_verified_data(backend.students)
+
+    with col3:
+        if st.button('Download Monthly Data', use_container_width=True):
+            download_monthly_data(backend.bookings)
+
+    # Only this month's rows are loaded for the calendar, and only today's for the list
+    now = datetime.now()
+    bookings = backend.bookings.bookings_in_month(now.year, now.month)
+
+    st.subheader('Calendar View (Current Month Status)')
+    st.markdown(generate_calendar(bookings, now), unsafe_allow_html=True)
+
+    st.header("Today's Bookings")
+    current_date = now.strftime("%Y-%m-%d")
+    today_booking_details = backend.bookings.bookings_on(now.date())
+
+    if today_booking_details:
+        st.write(f"Bookings for today ({current_date}):")
+        for detail in today_booking_details:
+            st.write(f"- **Time Slot:** {detail[1]} | **Manager:** {detail[2]} | **SPOC:** {detail[3]}")
+    else:
+        st.info("No bookings scheduled for today.")
+
+if __name__ == '__main__':
+    with span('rerun.booking_page'), maybe_profile('booking_page'):
+        main()
+    metrics_panel()
+    profiles_panel()
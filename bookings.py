@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import pandas as pd
+
+from db import connection, write_version
+from metrics import increment
+
+BOOKINGS_DB = 'slot_booking_new.db'
+CACHE_ENTRIES = 32
+
+logger = logging.getLogger('slbook.bookings')
+
+# (path, query name, args) -> (write_version, result); shared by every session in the process
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def ensure_bookings_schema(conn):
+    """Create appointment_bookings and its unique (date, SPOC) index if missing."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS appointment_bookings
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    date TEXT,
+                    time_range TEXT,
+                    manager TEXT,
+                    spoc TEXT,
+                    booked_by TEXT)''')
+
+    has_index = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_bookings_date_spoc'").fetchone()
+    if has_index:
+        return
+
+    # Older databases can already hold double bookings; keep the earliest one for each SPOC and date
+    _set_aside_double_bookings(conn)
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_date_spoc
+                    ON appointment_bookings (date, lower(trim(spoc)))''')
+
+
+def _set_aside_double_bookings(conn):
+    """Move all but the earliest booking of each SPOC and date to appointment_bookings_duplicates.
+
+    Uploaded tables do not all have the same columns, so each moved row is kept whole as a
+    JSON object. A row already recorded there, e.g. when the same file is uploaded again,
+    is not recorded twice. Returns the number of rows moved.
+    """
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(appointment_bookings)')]
+    row_json = ', '.join("'{0}', \"{1}\"".format(c.replace("'", "''"), c.replace('"', '""')) for c in columns)
+    losers = '''rowid NOT IN (SELECT MIN(rowid) FROM appointment_bookings
+                                GROUP BY date, lower(trim(spoc)))'''
+    conn.execute('''CREATE TABLE IF NOT EXISTS appointment_bookings_duplicates
+                    (booking_rowid INTEGER,
+                    date TEXT,
+                    spoc TEXT,
+                    booking TEXT,
+                    removed_at TEXT)''')
+    # Tables written before the unique index may hold repeats; keep the first of each
+    conn.execute('''DELETE FROM appointment_bookings_duplicates WHERE rowid NOT IN
+                    (SELECT MIN(rowid) FROM appointment_bookings_duplicates GROUP BY booking)''')
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_duplicates_booking
+                    ON appointment_bookings_duplicates (booking)''')
+    conn.execute(f'''INSERT OR IGNORE INTO appointment_bookings_duplicates
+                     SELECT rowid, date, spoc, json_object({row_json}), datetime('now')
+                     FROM appointment_bookings WHERE {losers}''')
+    moved = conn.execute(f'DELETE FROM appointment_bookings WHERE {losers}').rowcount
+    if moved:
+        logger.warning('Moved %d double bookings to appointment_bookings_duplicates', moved)
+    return moved
+
+
+def book_slot(date, time_range, manager, spoc, booked_by, path=BOOKINGS_DB):
+    """Insert a booking in one statement; return False if the SPOC is already booked on that date."""
+    with connection(path) as conn:
+        cur = conn.execute('''INSERT INTO appointment_bookings (date, time_range, manager, spoc, booked_by)
+                              VALUES (?, ?, ?, ?, ?)
+                              ON CONFLICT DO NOTHING''', (date, time_range, manager, spoc, booked_by))
+    return cur.rowcount == 1
+
+
+def bookings_between(start, end, path=BOOKINGS_DB, columns=('date', 'time_range', 'manager', 'spoc')):
+    """Bookings with start <= date < end, in date order.
+
+    Dates are stored as ISO text, so the range is a prefix scan of the (date, spoc) index
+    and the cost depends on the rows in range, not on the table's history.
+    """
+    with connection(path) as conn:
+        return pd.read_sql_query(f'''SELECT {', '.join(columns)} FROM appointment_bookings
+                                     WHERE date >= ? AND date < ? ORDER BY date''',
+                                 conn, params=(str(start), str(end)))
+
+
+def _cached(path, name, args, load):
+    """Return `load()`, reusing the last result until the database is written to."""
+    key = (os.path.abspath(path), name, args)
+    version = write_version(path)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == version:
+            _cache.move_to_end(key)
+            increment('bookings_cache.hit')
+            return hit[1]
+
+    increment('bookings_cache.miss')
+    result = load()
+    with _cache_lock:
+        _cache[key] = (version, result)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return result
+
+
+def month_bounds(year, month):
+    """ISO (first day, first day of the next month) of a month, for a date >= start AND date < end range."""
+    return f'{year:04d}-{month:02d}-01', f'{year + month // 12:04d}-{month % 12 + 1:02d}-01'
+
+
+def bookings_in_month(year, month, path=BOOKINGS_DB):
+    """One month's bookings with `date` parsed, as generate_calendar expects.
+
+    The frame is shared between sessions until the next write; do not modify it.
+    """
+    def load():
+        bookings = bookings_between(*month_bounds(year, month), path)
+        bookings['date'] = pd.to_datetime(bookings['date'])
+        return bookings
+
+    return _cached(path, 'month', (year, month), load)
+
+
+def bookings_on(day, path=BOOKINGS_DB):
+    """(date, time_range, manager, spoc) tuples for one day."""
+    return _cached(path, 'day', str(day), lambda: tuple(
+        bookings_between(day, day + timedelta(days=1), path).itertuples(index=False, name=None)))
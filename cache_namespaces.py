@@ -0,0 +1,18 @@
+import threading
+
+# Namespace (usually a worksheet or table name) -> generation, bumped by every write to it
+_generations = {}
+_lock = threading.Lock()
+
+
+def generation(namespace):
+    """Current generation of `namespace`; pass it as an argument to a cached function
+    so that entries cached before the last invalidate() are never hit again."""
+    with _lock:
+        return _generations.get(namespace, 0)
+
+
+def invalidate(namespace):
+    """Retire every cache entry of `namespace` without touching other namespaces."""
+    with _lock:
+        _generations[namespace] = _generations.get(namespace, 0) + 1
@@ -0,0 +1,62 @@
+import calendar
+from datetime import datetime
+from functools import lru_cache
+
+from metrics import timed
+
+CALENDAR_CSS = """
+    <style>
+        .calendar {
+            display: grid;
+            grid-template-columns: repeat(7, 1fr);
+            gap: 10px;
+            margin-top: 20px;
+        }
+        .day {
+            padding: 10px;
+            border: 1px solid #ccc;
+            text-align: center;
+        }
+        .day-number {
+            font-size: 1.2em;
+            font-weight: bold;
+        }
+    </style>
+"""
+
+
+def booking_counts_by_day(bookings, year, month):
+    """Return {day: number of bookings} for one month using a single value_counts over the date column."""
+    if bookings.empty or 'date' not in bookings.columns:
+        return {}
+    dates = bookings['date']
+    in_month = dates[(dates.dt.year == year) & (dates.dt.month == month)]
+    return in_month.dt.day.value_counts().to_dict()
+
+
+@lru_cache(maxsize=64)
+def month_calendar_html(year, month, booked_days):
+    """Render the month grid; `booked_days` is a frozenset so unchanged months hit the cache."""
+    weekday_names = list(calendar.day_abbr)
+    days_html = ''
+    for day, weekday in calendar.Calendar().itermonthdays2(year, month):
+        if day == 0:
+            days_html += '<div class="day"></div>'
+            continue
+        day_style = 'background-color: red;' if weekday == 6 else ('background-color: #b3e6b3;' if day in booked_days else '')
+        days_html += f'<div class="day" style="{day_style}"><span class="day-number">{day}</span><br>{weekday_names[weekday]}</div>'
+
+    return f"""
+    {CALENDAR_CSS}
+    <div class="calendar">
+        {days_html}
+    </div>
+    """
+
+
+@timed('render.calendar')
+def generate_calendar(bookings, now=None):
+    """Calendar HTML for the current month with booked days highlighted."""
+    now = now or datetime.now()
+    counts = booking_counts_by_day(bookings, now.year, now.month)
+    return month_calendar_html(now.year, now.month, frozenset(day for day, n in counts.items() if n))
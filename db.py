@@ -0,0 +1,117 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from metrics import span
+
+
+# Settings applied to every pooled SQLite connection
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 16384          # page cache per connection (16 MiB)
+MMAP_SIZE = 256 * 1024 * 1024   # memory-map up to 256 MiB of each database file
+POOL_SIZE = 8                   # idle connections kept per database file
+
+
+def _open_connection(path):
+    """Open a SQLite connection tuned for many concurrent Streamlit sessions."""
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KIB}')
+    conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+
+class ConnectionPool:
+    """Keep open connections per database file and lend them out one thread at a time."""
+
+    def __init__(self, size=POOL_SIZE):
+        self._size = size
+        self._idle = {}
+        self._writes = {}   # path -> number of borrows that changed rows
+        self._lock = threading.Lock()
+
+    def _idle_queue(self, path):
+        with self._lock:
+            if path not in self._idle:
+                self._idle[path] = queue.LifoQueue(maxsize=self._size)
+            return self._idle[path]
+
+    def write_count(self, path):
+        with self._lock:
+            return self._writes.get(os.path.abspath(path), 0)
+
+    @contextmanager
+    def connection(self, path):
+        key = os.path.abspath(path)
+        idle = self._idle_queue(key)
+        try:
+            conn = idle.get_nowait()
+        except queue.Empty:
+            conn = _open_connection(path)
+
+        changes = conn.total_changes
+        try:
+            # Commits on success, rolls back if the caller raised
+            with span(f'sqlite.{os.path.basename(key)}'), conn:
+                yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            # Counted after the commit, so a reader that sees the new count also sees the rows
+            if conn.total_changes != changes:
+                with self._lock:
+                    self._writes[key] = self._writes.get(key, 0) + 1
+            try:
+                idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self):
+        with self._lock:
+            for idle in self._idle.values():
+                while not idle.empty():
+                    idle.get_nowait().close()
+            self._idle.clear()
+
+
+# One pool per server process, shared by every session and by background worker threads
+# (a plain module global, since st.cache_resource warns when called off the script thread)
+_pool = ConnectionPool()
+
+
+def get_pool():
+    return _pool
+
+
+def data_version(path):
+    """Cheap change marker for a database: size and mtime of the file and of its WAL.
+
+    An empty WAL counts as missing, since merely opening a connection creates one.
+    """
+    parts = []
+    for file_path in (path, path + '-wal'):
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            stat = None
+        parts.append(f'{stat.st_mtime_ns}:{stat.st_size}' if stat and stat.st_size else '-')
+    return '/'.join(parts)
+
+
+def write_version(path):
+    """Version of a database that changes after every write.
+
+    Writes through this process's pool bump a counter immediately; writes from other
+    processes (upload.py, del.py) are caught by the file size/mtime marker.
+    """
+    return get_pool().write_count(path), data_version(path)
+
+
+def connection(path):
+    """Borrow a pooled connection to `path`; use as `with connection(...) as conn:`."""
+    return get_pool().connection(path)
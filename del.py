@@ -1,18 +1,12 @@
 
 
-import sqlite3
+from db import connection
 
 # Function to delete booking by ID
 def delete_booking_by_id(booking_id):
-    conn = sqlite3.connect('slot_booking_new.db')
-    c = conn.cursor()
-
-    # Execute delete operation
-    c.execute("DELETE FROM appointment_bookings WHERE id = ?", (booking_id,))
-
-    # Commit changes and close connection
-    conn.commit()
-    conn.close()
+    with connection('slot_booking_new.db') as conn:
+        # Execute delete operation; the transaction commits when the block exits
+        conn.execute("DELETE FROM appointment_bookings WHERE id = ?", (booking_id,))
 
     print(f"Booking with ID {booking_id} deleted successfully.")
 
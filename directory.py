@@ -0,0 +1,68 @@
+import os
+import threading
+
+import pandas as pd
+
+from metrics import span, timed
+
+MANAGERS_FILE = 'managers_spocs.xlsx'
+SPOC_LIST_FILE = 'SPOC_List.xlsx'
+# Workbook column -> directory column, applied before the index is built
+MANAGER_COLUMNS = (('Actual_Manager_Column_Name', 'Manager Name'), ('Actual_SPOC_Column_Name', 'SPOC Name'))
+
+
+class ManagerDirectory:
+    """Manager -> SPOC lookup compiled once from the managers workbook.
+
+    `managers` keeps the workbook's first-seen order (as Series.unique() did), and each
+    manager's SPOC list is precomputed, so filling both selectboxes is a dict lookup.
+    """
+
+    def __init__(self, df):
+        spocs = {}
+        for manager, spoc in zip(df['Manager Name'], df['SPOC Name']):
+            spocs.setdefault(manager, []).append(spoc)
+        self.managers = list(spocs)
+        self._spocs = spocs
+
+    def spocs(self, manager):
+        return self._spocs.get(manager, [])
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+
+# (loader, path, args) -> (signature, compiled value); shared by every session in the process
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def _compile_on_change(name, path, args, build):
+    key = (name, path, args)
+    signature = _file_signature(path)
+    with _compiled_lock:
+        cached = _compiled.get(key)
+        if cached is None or cached[0] != signature:
+            cached = (signature, build())
+            _compiled[key] = cached
+        return cached[1]
+
+
+def manager_directory(path=MANAGERS_FILE, rename=MANAGER_COLUMNS):
+    """Return the ManagerDirectory for `path`, rebuilt only when the workbook changes.
+
+    `rename` is a tuple of (workbook column, 'Manager Name' / 'SPOC Name') pairs.
+    """
+    def build():
+        with span('parse.managers_spocs'):
+            df = pd.read_excel(path).rename(columns=dict(rename))
+        return ManagerDirectory(df)
+
+    return _compile_on_change('managers', path, rename, build)
+
+
+def spoc_list(path=SPOC_LIST_FILE):
+    """The SPOC list workbook as a DataFrame, re-read only when the file changes; do not modify it."""
+    return _compile_on_change('spoc_list', path, (), timed('parse.spoc_list')(lambda: pd.read_excel(path)))
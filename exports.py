@@ -0,0 +1,56 @@
+import tempfile
+
+import pandas as pd
+import streamlit as st
+
+from db import connection
+
+EXPORT_CHUNK_ROWS = 50_000
+
+
+def write_csv(out, db_path, query, params=(), transform=None, chunksize=EXPORT_CHUNK_ROWS):
+    """Append the rows of `query` as CSV to the binary file `out`, one chunk at a time.
+
+    `transform` may filter or reshape each chunk. Returns the number of rows written.
+    """
+    rows = 0
+    with connection(db_path) as conn:
+        for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunksize):
+            if transform is not None:
+                chunk = transform(chunk)
+            chunk.to_csv(out, index=False, header=out.tell() == 0)
+            rows += len(chunk)
+    return rows
+
+
+def export_csv(db_path, query, params=(), transform=None, chunksize=EXPORT_CHUNK_ROWS):
+    """Export `query` to a temporary CSV file; return the rewound file and its row count."""
+    out = tempfile.TemporaryFile(mode='w+b')
+    rows = write_csv(out, db_path, query, params, transform, chunksize)
+    out.seek(0)
+    return out, rows
+
+
+def frame_csv(frame, transform=None):
+    """Write a DataFrame to a temporary CSV file; return the rewound file and its row count."""
+    if transform is not None and not frame.empty:
+        frame = transform(frame)
+    out = tempfile.TemporaryFile(mode='w+b')
+    frame.to_csv(out, index=False)
+    out.seek(0)
+    return out, len(frame)
+
+
+def csv_download_button(label, db_path, query, file_name, params=(), transform=None, empty_message=None):
+    """Export `query` to CSV and offer it through Streamlit's media download endpoint."""
+    return file_download_button(label, *export_csv(db_path, query, params, transform), file_name, empty_message)
+
+
+def file_download_button(label, out, rows, file_name, empty_message=None):
+    """Offer an exported CSV file (as returned by export_csv) for download and close it."""
+    with out:
+        if rows == 0 and empty_message:
+            st.error(empty_message)
+            return False
+        st.download_button(label=label, data=out.read(), file_name=file_name, mime='text/csv')
+    return True
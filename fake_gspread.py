@@ -0,0 +1,246 @@
+"""In-process stand-in for the parts of gspread that sheets_client.py and storage.py use.
+
+Spreadsheets live in a process-wide registry keyed by spreadsheet id, so every session (and every
+AppTest run) in the process sees the same data. Values are kept as strings, the way the
+Sheets API returns them.
+
+Every call that would be an HTTP request to the Sheets API goes through one gate that can
+add latency, enforce a per-minute request quota (answered with HTTP 429, as Google does)
+and cap the rows of a worksheet, so the Sheets code path can be load-tested offline.
+Configure it with configure() or, for a Streamlit server, with environment variables:
+
+    SLBOOK_FAKE_SHEETS=1                  use this module instead of the Google API
+    SLBOOK_FAKE_LATENCY_MS=120            mean added latency per request
+    SLBOOK_FAKE_JITTER_MS=40              +/- uniform jitter around that mean
+    SLBOOK_FAKE_QUOTA_PER_MINUTE=60       requests per rolling minute before 429s (0: unlimited)
+    SLBOOK_FAKE_MAX_ROWS=10000            rows a worksheet may grow to (0: unlimited)
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, extract_id_from_url
+
+QUOTA_WINDOW = 60.0   # seconds; Google's quotas are per rolling minute
+
+
+class FakeConfig:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, quota_per_minute=0, max_rows=0):
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.quota_per_minute = int(quota_per_minute)
+        self.max_rows = int(max_rows)
+
+    @classmethod
+    def from_env(cls):
+        return cls(latency_ms=os.environ.get('SLBOOK_FAKE_LATENCY_MS', 0),
+                   jitter_ms=os.environ.get('SLBOOK_FAKE_JITTER_MS', 0),
+                   quota_per_minute=os.environ.get('SLBOOK_FAKE_QUOTA_PER_MINUTE', 0),
+                   max_rows=os.environ.get('SLBOOK_FAKE_MAX_ROWS', 0))
+
+
+_config = FakeConfig.from_env()
+_window = deque()             # monotonic times of the requests in the current quota window
+_request_counts = Counter()   # call name -> requests made, including rejected ones
+_rejected = Counter()         # HTTP status -> requests answered with that error
+_gate_lock = threading.Lock()
+
+_spreadsheets = {}
+_registry_lock = threading.Lock()
+
+
+def configure(**settings):
+    """Change the latency, quota or row limit of every fake client in the process."""
+    global _config
+    _config = FakeConfig(**{**vars(_config), **settings})
+
+
+def _api_error(status, message, reason):
+    response = requests.models.Response()
+    response.status_code = status
+    response._content = json.dumps({'error': {'code': status, 'message': message, 'status': reason}}).encode()
+    with _gate_lock:
+        _rejected[status] += 1
+    return APIError(response)
+
+
+def _request(name):
+    """Account for one API request: apply the quota, then the latency."""
+    config = _config
+    with _gate_lock:
+        _request_counts[name] += 1
+        over_quota = False
+        if config.quota_per_minute:
+            now = time.monotonic()
+            while _window and now - _window[0] >= QUOTA_WINDOW:
+                _window.popleft()
+            over_quota = len(_window) >= config.quota_per_minute
+            if not over_quota:
+                _window.append(now)
+    if over_quota:
+        raise _api_error(429, "Quota exceeded for quota metric 'Requests' and limit "
+                              "'Requests per minute per user'.", 'RESOURCE_EXHAUSTED')
+    if config.latency_ms or config.jitter_ms:
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+
+
+def request_stats():
+    """Requests made per call name, and requests rejected per HTTP status."""
+    with _gate_lock:
+        return {'requests': dict(_request_counts), 'rejected': dict(_rejected)}
+
+
+class FakeWorksheet:
+    def __init__(self, title, rows=1000, cols=26):
+        self.title = title
+        self.row_count = int(rows)
+        self.col_count = int(cols)
+        self._values = []
+        self._deleted = False
+        self._lock = threading.Lock()
+
+    def _check(self):
+        # A handle to a deleted worksheet names a range the API can no longer resolve
+        if self._deleted:
+            raise _api_error(400, f"Unable to parse range: '{self.title}'", 'INVALID_ARGUMENT')
+
+    def get_all_values(self):
+        _request('get_all_values')
+        self._check()
+        return self._read('')
+
+    def get(self, range_name):
+        _request('get')
+        self._check()
+        return self._read(range_name)
+
+    def _read(self, cells):
+        if not cells:
+            with self._lock:
+                return [list(row) for row in self._values]
+        grid = a1_range_to_grid_range(cells)
+        first, last = grid.get('startRowIndex', 0), grid.get('endRowIndex')
+        left, right = grid.get('startColumnIndex', 0), grid.get('endColumnIndex')
+        with self._lock:
+            return [row[left:right] for row in self._values[first:last]]
+
+    def col_values(self, col, value_render_option='FORMATTED_VALUE'):
+        """The 1-based column `col` without trailing empty cells, as gspread returns it."""
+        _request('col_values')
+        self._check()
+        with self._lock:
+            values = [row[col - 1] if len(row) >= col else '' for row in self._values]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def append_row(self, values, value_input_option='RAW', **kwargs):
+        self.append_rows([values], value_input_option)
+
+    def append_rows(self, values, value_input_option='RAW', **kwargs):
+        _request('append_rows')
+        self._check()
+        rows = [['' if value is None else str(value) for value in row] for row in values]
+        max_rows = _config.max_rows
+        with self._lock:
+            if max_rows and len(self._values) + len(rows) > max_rows:
+                raise _api_error(400, f'Range ({self.title}) exceeds grid limits. Max rows: {max_rows}',
+                                 'INVALID_ARGUMENT')
+            self._values.extend(rows)
+            self.row_count = max(self.row_count, len(self._values))
+
+
+class FakeSpreadsheet:
+    def __init__(self, spreadsheet_id):
+        self.id = spreadsheet_id
+        self._worksheets = {}
+        self._lock = threading.Lock()
+
+    def worksheet(self, title):
+        _request('worksheet')
+        with self._lock:
+            if title not in self._worksheets:
+                raise WorksheetNotFound(title)
+            return self._worksheets[title]
+
+    def add_worksheet(self, title, rows, cols, **kwargs):
+        _request('add_worksheet')
+        with self._lock:
+            ws = self._worksheets[title] = FakeWorksheet(title, rows, cols)
+            return ws
+
+    def worksheets(self):
+        _request('worksheets')
+        with self._lock:
+            return list(self._worksheets.values())
+
+    def del_worksheet(self, worksheet):
+        _request('del_worksheet')
+        with self._lock:
+            del self._worksheets[worksheet.title]
+        worksheet._deleted = True
+
+
+class FakeHTTPClient:
+    """The low-level values endpoints of gspread's HTTPClient."""
+
+    def values_batch_get(self, id, ranges, params=None):
+        _request('values_batch_get')
+        spreadsheet = _spreadsheet(id)
+        value_ranges = []
+        for range_name in ranges:
+            title, _, cells = range_name.partition('!')
+            if title.startswith("'"):
+                title = title[1:-1].replace("''", "'")
+            with spreadsheet._lock:
+                ws = spreadsheet._worksheets.get(title)
+            if ws is None:
+                raise _api_error(400, f'Unable to parse range: {range_name}', 'INVALID_ARGUMENT')
+            values = ws._read(cells)
+            value_ranges.append({'range': range_name, 'majorDimension': 'ROWS', **({'values': values} if values else {})})
+        return {'spreadsheetId': id, 'valueRanges': value_ranges}
+
+
+class FakeClient:
+    def __init__(self):
+        self.http_client = FakeHTTPClient()
+
+    def open_by_url(self, url):
+        _request('open_by_url')
+        return open_spreadsheet(url)
+
+
+def _spreadsheet(spreadsheet_id):
+    with _registry_lock:
+        if spreadsheet_id not in _spreadsheets:
+            _spreadsheets[spreadsheet_id] = FakeSpreadsheet(spreadsheet_id)
+        return _spreadsheets[spreadsheet_id]
+
+
+def open_spreadsheet(url):
+    """Return the fake spreadsheet for `url`, creating an empty one on first use.
+
+    This is the seeding and inspection handle; it is not counted as an API request.
+    """
+    return _spreadsheet(extract_id_from_url(url))
+
+
+def reset_stats():
+    """Start a new quota window and zero the request accounting."""
+    with _gate_lock:
+        _window.clear()
+        _request_counts.clear()
+        _rejected.clear()
+
+
+def reset():
+    """Drop every spreadsheet and the request accounting; the configuration is kept."""
+    with _registry_lock:
+        _spreadsheets.clear()
+    reset_stats()
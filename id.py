@@ -1,31 +1,25 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
-import calendar
 from datetime import datetime
 import base64
 from io import BytesIO
 
-st.text("The Slot Booking Platform is currently under development,so dont Book Slot For Now.")
+from admin import metrics_panel
+from bookings import BOOKINGS_DB, book_slot, bookings_in_month, bookings_on
+from calendar_view import generate_calendar
+from directory import manager_directory
+from exports import csv_download_button
+from metrics import span
+from migrations import ensure_schema
+from profiling import maybe_profile, profiles_panel
+from storage import SQLiteStudentStore
+from upload_jobs import show_upload_progress, submit_upload
+from validation import clean_id_series, keep_valid_rows, valid_id_mask
 
-@st.cache_data(hash_funcs={pd.DataFrame: lambda _: None})
-def load_data(file):
-    df = pd.read_excel(file)
-    df.rename(columns={'Actual_Manager_Column_Name': 'Manager Name', 'Actual_SPOC_Column_Name': 'SPOC Name'}, inplace=True)
-    return df
+st.text("The Slot Booking Platform is currently under development,so dont Book Slot For Now.")
 
 def create_table():
-    conn = sqlite3.connect('slot_booking_new.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS appointment_bookings
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 date TEXT,
-                 time_range TEXT,
-                 manager TEXT,
-                 spoc TEXT,
-                 booked_by TEXT)''')
-    conn.commit()
-    conn.close()
+    ensure_schema(BOOKINGS_DB, 'Plana.db')
 
 def insert_booking(date, time_range, manager, spoc, booked_by):
     st.write(f'Attempting to book slot for: Date: {date}, Time Range: {time_range}, Manager: {manager}, SPOC: {spoc}, Booked By: {booked_by}')
@@ -49,118 +43,26 @@ def insert_booking(date, time_range, manager, spoc, booked_by):
         st.error('If Error Message Reflects Or To Book Slot On Holidays & Other Than Official Hours Please Contact To Pritam Basu & Kousik Dey.')
         return
 
-    conn = sqlite3.connect('slot_booking_new.db')
-    c = conn.cursor()
-    c.execute('''SELECT * FROM appointment_bookings 
-                 WHERE date = ? AND spoc = ?''', (date, spoc))
-    existing_booking = c.fetchone()
-
-    if existing_booking:
-        conn.close()
+    # The unique (date, spoc) index rejects double bookings, even from simultaneous clicks
+    if not book_slot(date, time_range, manager, spoc, booked_by):
         st.error('Slot booking failed. This SPOC is already booked for the selected date.')
         return
 
-    c.execute('''INSERT INTO appointment_bookings (date, time_range, manager, spoc, booked_by)
-                 VALUES (?, ?, ?, ?, ?)''', (date, time_range, manager, spoc, booked_by))
-    conn.commit()
-    conn.close()
     st.success('Slot booked successfully!')
 
 # Update plana.db only with CMIS_IDs present in ids.xlsx
 def update_another_database(file):
-    df = pd.read_excel(file)
-    ids_df = pd.read_excel('ids.xlsx')
-    valid_ids = ids_df['CMIS_ID'].astype(str).unique()
-
-    df['CMIS ID'] = df['CMIS ID'].astype(str)
-    filtered_df = df[df['CMIS ID'].isin(valid_ids)]
-
-    if filtered_df.empty:
-        st.error("")
-        return
-
-    conn = sqlite3.connect('Plana.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS plana
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 cmis_id TEXT,
-                 student_name TEXT,
-                 cmis_ph_no TEXT,
-                 center_name TEXT,
-                 uploader_name TEXT,
-                 verification_type TEXT,
-                 mode_of_verification TEXT,
-                 verification_date TEXT)''')
-    conn.commit()
-
-    for _, row in filtered_df.iterrows():
-        c.execute('''INSERT INTO plana (cmis_id, student_name, cmis_ph_no, center_name, uploader_name, verification_type, mode_of_verification, verification_date)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', (row['CMIS ID'], row['Student Name'], row['CMIS PH No(10 Number)'],
-                                                          row['Center Name'], row['Name Of Uploder'], row['Verification Type'], row['Mode Of Verification'], row['Verification Date']))
-    conn.commit()
-    conn.close()
-    st.success(f"{len(filtered_df)} valid records inserted successfully.")
+    # Each batch is filtered against ids.xlsx and committed as soon as it is read
+    st.query_params['upload_job'] = submit_upload(file, SQLiteStudentStore('Plana.db', 'plana'),
+                                                  keep=keep_valid_rows)
 
 def download_another_database_data():
-    conn = sqlite3.connect('Plana.db')
-    df = pd.read_sql_query("SELECT * FROM plana", conn)
-    conn.close()
-
-    ids_df = pd.read_excel('ids.xlsx')
-    valid_ids = ids_df['CMIS_ID'].astype(str).unique()
-    df['cmis_id'] = df['cmis_id'].astype(str)
+    def keep_valid_ids(chunk):
+        chunk['cmis_id'] = clean_id_series(chunk['cmis_id'])
+        return chunk[valid_id_mask(chunk['cmis_id'])]
 
-    filtered_df = df[df['cmis_id'].isin(valid_ids)]
-
-    if filtered_df.empty:
-        st.error("No valid data found for M&E verification.")
-        return
-
-    csv = filtered_df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="plana_filtered.csv">Download CSV</a>'
-    st.markdown(href, unsafe_allow_html=True)
-
-def generate_calendar(bookings):
-    cal = calendar.Calendar()
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-    weekday_names = list(calendar.day_abbr)
-
-    days_html = ''
-    for day in cal.itermonthdays(current_year, current_month):
-        if day == 0:
-            days_html += '<div class="day"></div>'
-        else:
-            date = pd.Timestamp(year=current_year, month=current_month, day=day)
-            bookings_on_day = bookings[(bookings['date'].dt.year == current_year) &
-                                       (bookings['date'].dt.month == current_month) &
-                                       (bookings['date'].dt.day == day)]
-            day_style = 'background-color: red;' if date.weekday() == 6 else ('background-color: #b3e6b3;' if not bookings_on_day.empty else '')
-            days_html += f'<div class="day" style="{day_style}"><span class="day-number">{day}</span><br>{weekday_names[date.weekday()]}</div>'
-
-    return f"""
-    <style>
-        .calendar {{
-            display: grid;
-            grid-template-columns: repeat(7, 1fr);
-            gap: 10px;
-            margin-top: 20px;
-        }}
-        .day {{
-            padding: 10px;
-            border: 1px solid #ccc;
-            text-align: center;
-        }}
-        .day-number {{
-            font-size: 1.2em;
-            font-weight: bold;
-        }}
-    </style>
-    <div class="calendar">
-        {days_html}
-    </div>
-    """
+    csv_download_button('Download CSV', 'Plana.db', "SELECT * FROM plana", 'plana_filtered.csv',
+                        transform=keep_valid_ids, empty_message="No valid data found for M&E verification.")
 
 def download_sample_excel():
     sample_data = {
@@ -190,11 +92,10 @@ def download_sample_excel():
 def main():
     st.title('Slot Booking Platform')
     create_table()
-    data = load_data('managers_spocs.xlsx')
+    directory = manager_directory('managers_spocs.xlsx')
 
-    selected_manager = st.selectbox('Select Manager', data['Manager Name'].unique())
-    spocs_for_manager = data[data['Manager Name'] == selected_manager]['SPOC Name'].tolist()
-    selected_spoc = st.selectbox('Select SPOC', spocs_for_manager)
+    selected_manager = st.selectbox('Select Manager', directory.managers)
+    selected_spoc = st.selectbox('Select SPOC', directory.spocs(selected_manager))
 
     selected_date = st.date_input('Select Date')
     time_ranges = ['10:00 AM - 11:00 AM', '11:00 AM - 12:00 PM', '12:00 PM - 1:00 PM', '2:00 PM - 3:00 PM', '3:00 PM - 4:00 PM']
@@ -206,12 +107,12 @@ def main():
     st.subheader('Please ensure that only student data marked as Not Joined or Not Contacted from the M&E database is included.')
 
     file = st.file_uploader('Upload Excel', type=['xlsx', 'xls'])
-    data_uploaded = st.session_state.get('data_uploaded', False)
     if file is not None:
         if st.button('Update Data'):
             update_another_database(file)
-            st.session_state['data_uploaded'] = True
-            data_uploaded = True
+    # Set once an upload job has finished with valid rows
+    show_upload_progress()
+    data_uploaded = st.session_state.get('data_uploaded', False)
 
     if not data_uploaded:
         st.warning('Please upload student data before booking a slot.')
@@ -226,22 +127,16 @@ def main():
     if st.button('Download Data For M&E Purpose'):
         download_another_database_data()
 
-    conn = sqlite3.connect('slot_booking_new.db')
-    bookings = pd.read_sql_query("SELECT * FROM appointment_bookings", conn)
-    conn.close()
-    if 'date' in bookings.columns:
-        bookings['date'] = pd.to_datetime(bookings['date'])
+    # Only this month's rows are loaded for the calendar, and only today's for the list
+    now = datetime.now()
+    bookings = bookings_in_month(now.year, now.month)
 
     st.subheader('Calendar View (Current Month Status)')
-    st.markdown(generate_calendar(bookings), unsafe_allow_html=True)
+    st.markdown(generate_calendar(bookings, now), unsafe_allow_html=True)
 
     st.header("Today's Bookings")
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    conn = sqlite3.connect('slot_booking_new.db')
-    c = conn.cursor()
-    c.execute("SELECT date, time_range, manager, spoc FROM appointment_bookings WHERE date = ?", (current_date,))
-    today_booking_details = c.fetchall()
-    conn.close()
+    current_date = now.strftime("%Y-%m-%d")
+    today_booking_details = bookings_on(now.date())
 
     if today_booking_details:
         st.write(f"Bookings for today ({current_date}):")
@@ -251,10 +146,10 @@ def main():
         st.write("No bookings for today.")
 
     if st.button('Download Monthly Data'):
-        csv = bookings.to_csv(index=False)
-        b64 = base64.b64encode(csv.encode()).decode()
-        href = f'<a href="data:file/csv;base64,{b64}" download="monthly_bookings.csv">Download CSV</a>'
-        st.markdown(href, unsafe_allow_html=True)
+        csv_download_button('Download CSV', 'slot_booking_new.db', "SELECT * FROM appointment_bookings", 'monthly_bookings.csv')
 
 if __name__ == '__main__':
-    main()
+    with span('rerun.id'), maybe_profile('id'):
+        main()
+    metrics_panel()
+    profiles_panel()
@@ -0,0 +1,80 @@
+import openpyxl
+import pandas as pd
+
+from db import connection
+
+INGEST_BATCH_ROWS = 5000
+
+
+def iter_xlsx_batches(file, batch_rows=INGEST_BATCH_ROWS):
+    """Yield DataFrames of up to `batch_rows` rows from the first sheet of an .xlsx file.
+
+    The workbook is opened in openpyxl's read-only mode, which streams rows from the
+    sheet XML instead of building the whole object model first.
+    """
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
+        width = len(columns)
+
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            if len(batch) >= batch_rows:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        wb.close()
+
+
+def iter_upload_batches(file, batch_rows=INGEST_BATCH_ROWS):
+    """Yield an uploaded .xlsx, .xls or .csv file as DataFrames of at most `batch_rows` rows."""
+    extension = file.name.rsplit('.', 1)[-1].lower()
+    if extension == 'xlsx':
+        yield from iter_xlsx_batches(file, batch_rows)
+    elif extension == 'csv':
+        yield from pd.read_csv(file, chunksize=batch_rows)
+    elif extension == 'xls':
+        # openpyxl cannot stream the legacy format; read it whole and hand it out in slices
+        df = pd.read_excel(file)
+        for start in range(0, len(df), batch_rows):
+            yield df.iloc[start:start + batch_rows]
+    else:
+        raise ValueError(f'Unsupported file format: .{extension}')
+
+
+def replace_table_from_upload(file, db_path, table, finish=None, batch_rows=INGEST_BATCH_ROWS):
+    """Replace `table` with the rows of an uploaded file; return the number of rows written.
+
+    Batches are streamed into a staging table, committing after each one, and the staging
+    table takes the place of `table` in one transaction once the whole file has been read,
+    so a failed upload leaves the old table as it was. Column types follow the first batch.
+    `finish(conn)`, e.g. to restore indexes, runs in that same transaction; if it raises,
+    the swap is rolled back too.
+    """
+    staging = f'{table}_upload'
+    rows = 0
+    try:
+        for batch in iter_upload_batches(file, batch_rows):
+            with connection(db_path) as conn:
+                batch.to_sql(staging, conn, if_exists='replace' if rows == 0 else 'append', index=False)
+            rows += len(batch)
+        if rows:
+            with connection(db_path) as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+                conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{table}"')
+                if finish is not None:
+                    finish(conn)
+    finally:
+        with connection(db_path) as conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{staging}"')
+    return rows
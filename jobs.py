@@ -0,0 +1,94 @@
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'slbook_exports')
+MAX_WORKERS = 2
+POLL_SECONDS = 1
+
+
+class ExportJobs:
+    """Build export files off the script thread and keep the newest artifact per export name.
+
+    Artifacts are keyed by (name, data version): asking again for an unchanged table returns the
+    finished (or still running) job instead of rebuilding the file.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, directory=EXPORT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._directory = directory
+        self._jobs = {}   # name -> (version, Future resolving to the artifact path)
+        self._lock = threading.Lock()
+
+    def get(self, name, version):
+        with self._lock:
+            job = self._jobs.get(name)
+        return job[1] if job and job[0] == version else None
+
+    def submit(self, name, version, build, suffix):
+        """Run `build(path)` in the background unless this version is already built or building."""
+        with self._lock:
+            job = self._jobs.get(name)
+            if job and job[0] == version and not (job[1].done() and job[1].exception()):
+                return job[1]
+            digest = hashlib.sha1(repr(version).encode()).hexdigest()[:12]
+            path = os.path.join(self._directory, f'{name}-{digest}{suffix}')
+            future = self._executor.submit(self._build, build, path, job[1] if job else None)
+            self._jobs[name] = (version, future)
+            return future
+
+    @staticmethod
+    def _build(build, path, previous):
+        root, suffix = os.path.splitext(path)
+        partial = f'{root}.part{suffix}'   # keep the extension; ExcelWriter picks its format from it
+        build(partial)
+        os.replace(partial, path)
+        # Drop the artifact this one supersedes
+        if previous is not None and previous.done() and not previous.exception():
+            old_path = previous.result()
+            if old_path != path and os.path.exists(old_path):
+                os.remove(old_path)
+        return path
+
+
+@st.cache_resource
+def get_export_jobs():
+    return ExportJobs()
+
+
+@st.experimental_fragment(run_every=POLL_SECONDS)
+def _poll_export(name, version):
+    job = get_export_jobs().get(name, version)
+    if job is None or job.done():
+        st.rerun()
+    st.info('Preparing export in the background...')
+
+
+def export_download(button_label, name, version, build, download_label, file_name, mime):
+    """Button that queues `build` as a background export and then offers the finished file.
+
+    `version` must change whenever the exported data does (see db.data_version).
+    """
+    requested_key = f'export_requested_{name}'
+    if st.button(button_label):
+        get_export_jobs().submit(name, version, build, os.path.splitext(file_name)[1])
+        st.session_state[requested_key] = True
+
+    if not st.session_state.get(requested_key):
+        return
+
+    job = get_export_jobs().get(name, version)
+    if job is None:
+        st.info('The data changed since this export was requested. Press the export button again.')
+    elif not job.done():
+        _poll_export(name, version)
+    elif job.exception() is not None:
+        st.error(f'Export failed: {job.exception()}')
+    else:
+        with open(job.result(), 'rb') as f:
+            st.download_button(label=download_label, data=f.read(), file_name=file_name, mime=mime)
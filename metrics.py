@@ -0,0 +1,106 @@
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+logger = logging.getLogger('slbook.metrics')
+if os.environ.get('SLBOOK_METRICS_LOG'):
+    # One JSON object per finished span, e.g. for shipping to a log pipeline
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class _Timing:
+    __slots__ = ('count', 'errors', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = self.errors = 0
+        self.total = self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+
+# Process-wide, shared by every session and worker thread
+_timings = {}
+_counters = {}
+_lock = threading.Lock()
+
+
+def record(name, seconds, error=False):
+    ms = seconds * 1000
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = _timings[name] = _Timing()
+        timing.count += 1
+        timing.errors += error
+        timing.total += ms
+        timing.max = max(timing.max, ms)
+        timing.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({'span': name, 'ms': round(ms, 3), 'error': error, 'ts': time.time()}))
+
+
+@contextmanager
+def span(name):
+    """Time the block under `name`; a block that raises is counted as an error.
+
+    Streamlit's rerun/stop signals are BaseExceptions and are not counted as errors.
+    """
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        record(name, time.perf_counter() - start, error)
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def increment(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot():
+    """Counters and per-span count, error count, mean, max and histogram, as plain JSON-ready data."""
+    with _lock:
+        spans = {
+            name: {
+                'count': t.count,
+                'errors': t.errors,
+                'mean_ms': t.total / t.count,
+                'max_ms': t.max,
+                'histogram': {f'le_{bound}ms': n for bound, n in zip((*BUCKETS_MS, 'inf'), t.buckets)},
+            }
+            for name, t in _timings.items()
+        }
+        return {'spans': spans, 'counters': dict(_counters)}
+
+
+def reset():
+    with _lock:
+        _timings.clear()
+        _counters.clear()
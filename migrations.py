@@ -0,0 +1,128 @@
+import os
+import threading
+
+from bookings import BOOKINGS_DB, ensure_bookings_schema
+from db import connection
+from students import PLANA_COLUMNS, STUDENT_TABLE_COLUMNS, create_student_table, ensure_student_indexes
+
+# Old column name -> consolidated student column
+RENAMED_COLUMNS = {'date_of_verification': 'verification_date'}
+
+
+def _table_info(conn, table):
+    """Return [(name, declared type, is primary key)] for `table`, or [] if it does not exist."""
+    return [(name, kind.upper(), bool(pk)) for _, name, kind, _, _, pk in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def unify_student_table(conn, table):
+    """Bring `table` to the shared student layout, rebuilding it if names or types differ.
+
+    Uploaded Excel headers (PLANA_COLUMNS) become their student columns; columns the
+    layout does not know about (e.g. studentcap.booking_id) are kept as TEXT.
+    Existing ids are kept only if they were already the table's primary key.
+    """
+    existing = _table_info(conn, table)
+    if not existing:
+        create_student_table(conn, table)
+        return
+
+    expected = [(name, kind.split()[0], name == 'id') for name, kind in STUDENT_TABLE_COLUMNS]
+    if existing == expected:
+        return
+
+    known = {name for name, _ in STUDENT_TABLE_COLUMNS}
+    copied = {}   # new column -> old column
+    extra = []
+    for name, _, pk in existing:
+        target = RENAMED_COLUMNS.get(name) or PLANA_COLUMNS.get(name, name)
+        if target == 'id' and not pk:
+            continue   # ids from a pandas-written table are not unique; number the rows afresh
+        if target not in known:
+            extra.append(target)
+        copied.setdefault(target, name)
+
+    create_student_table(conn, f'{table}_unified', extra)
+    targets = ', '.join(f'"{new}"' for new in copied)
+    sources = ', '.join(f'"{old}"' if new == 'id' else f'CAST("{old}" AS TEXT)' for new, old in copied.items())
+    conn.execute(f'INSERT INTO "{table}_unified" ({targets}) SELECT {sources} FROM "{table}" ORDER BY rowid')
+    conn.execute(f'DROP TABLE "{table}"')
+    conn.execute(f'ALTER TABLE "{table}_unified" RENAME TO "{table}"')
+
+
+def _student_migrations(table):
+    return [
+        lambda conn: unify_student_table(conn, table),
+        lambda conn: ensure_student_indexes(conn, table),
+    ]
+
+
+def _booking_data_indexes(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_bookings_cmis_id ON bookings (cmis_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_bookings_center_name ON bookings (center_name)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_bookings_date_spoc ON bookings (date, spoc)')
+
+
+# Database file -> ordered migrations; migration N (1-based) leaves PRAGMA user_version = N.
+# Only ever append to these lists: a released step must not change.
+MIGRATIONS = {
+    'Plana.db': _student_migrations('plana'),
+    'slide.db': _student_migrations('bani'),
+    'duplicate.db': _student_migrations('studentcap'),
+    'booking_data.db': [
+        lambda conn: conn.execute('''CREATE TABLE IF NOT EXISTS bookings
+                                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                     upload_code INTEGER,
+                                     date TEXT,
+                                     cmis_id TEXT,
+                                     student_name TEXT,
+                                     cmis_ph_no TEXT,
+                                     center_name TEXT,
+                                     uploader_name TEXT,
+                                     verification_type TEXT,
+                                     mode_of_verification TEXT,
+                                     booking_details TEXT,
+                                     time_range TEXT,
+                                     manager TEXT,
+                                     spoc TEXT,
+                                     booked_by TEXT)'''),
+        _booking_data_indexes,
+    ],
+    BOOKINGS_DB: [ensure_bookings_schema],
+}
+
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def migrate(path, migrations=None):
+    """Apply the pending migrations of `path`, each in its own IMMEDIATE transaction.
+
+    The schema version is re-read after taking the write lock, so several processes
+    starting at once apply every step exactly once. Returns the resulting version.
+    """
+    migrations = MIGRATIONS[path] if migrations is None else migrations
+    with connection(path) as conn:
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= len(migrations):
+            return len(migrations)
+        for version, step in enumerate(migrations, start=1):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if conn.execute('PRAGMA user_version').fetchone()[0] < version:
+                    step(conn)
+                    conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def ensure_schema(*paths):
+    """Migrate each database once per process; cheap to call on every rerun."""
+    for path in paths or MIGRATIONS:
+        key = os.path.abspath(path)
+        with _migrated_lock:
+            if key in _migrated:
+                continue
+            migrate(path)
+            _migrated.add(key)
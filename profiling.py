@@ -0,0 +1,126 @@
+import cProfile
+import hmac
+import io
+import itertools
+import os
+import pstats
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+from admin import admin_token, is_admin
+
+PROFILE_KEEP = 20                # reports kept per server process
+PROFILE_TOP_FUNCTIONS = 40       # rows in the text summary
+PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'slbook_profiles')
+
+# App function (prefix) -> the user action a rerun that called it is filed under
+ACTIONS = (
+    ('insert_booking', 'book'),
+    ('update_another_database', 'upload'),
+    ('update_student_database', 'upload'),
+    ('resume_upload', 'upload'),
+    ('bulk_delete_', 'delete'),
+    ('download_', 'download'),
+    ('csv_download_button', 'download'),
+    ('export_download', 'download'),
+)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_reports = deque(maxlen=PROFILE_KEEP)
+_report_ids = itertools.count(1)
+_lock = threading.Lock()
+
+
+def profiling_requested():
+    """Profile every rerun with SLBOOK_PROFILE=1, or one session's reruns with ?profile=<admin token>."""
+    if os.environ.get('SLBOOK_PROFILE'):
+        return True
+    supplied = st.query_params.get('profile')
+    if not supplied:
+        return False
+    token = admin_token()
+    return bool(token) and hmac.compare_digest(str(token), supplied)
+
+
+def _triggering_action(stats):
+    called = {func for filename, _, func in stats.stats if filename.startswith(_APP_DIR)}
+    for prefix, action in ACTIONS:
+        if any(func.startswith(prefix) for func in called):
+            return action
+    return 'rerun'
+
+
+def _store(app, profiler, seconds):
+    stats = pstats.Stats(profiler)
+    summary = io.StringIO()
+    stats.stream = summary
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+
+    report_id = next(_report_ids)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f'{app}-{report_id}.prof')
+    stats.dump_stats(path)
+    report = {
+        'id': report_id,
+        'app': app,
+        'action': _triggering_action(stats),
+        'started_at': time.time() - seconds,
+        'seconds': seconds,
+        'summary': summary.getvalue(),
+        'path': path,
+    }
+    with _lock:
+        if len(_reports) == _reports.maxlen:
+            dropped = _reports.popleft()
+            if os.path.exists(dropped['path']):
+                os.remove(dropped['path'])
+        _reports.append(report)
+
+
+@contextmanager
+def maybe_profile(app):
+    """Run the block under cProfile when profiling is requested and keep the report."""
+    if not profiling_requested():
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _store(app, profiler, time.perf_counter() - start)
+
+
+def profile_reports():
+    """The kept reports, newest first."""
+    with _lock:
+        return list(reversed(_reports))
+
+
+def profiles_panel():
+    """Browse the kept profiles of this server process, for admins only."""
+    if not is_admin():
+        return
+
+    with st.expander('Profiles'):
+        reports = profile_reports()
+        if not reports:
+            st.write('No profiles yet. Set SLBOOK_PROFILE=1 or open the page with ?profile=<admin token>.')
+            return
+
+        labels = {r['id']: f"#{r['id']} {r['app']} {r['action']} {r['seconds'] * 1000:.0f} ms "
+                           f"({time.strftime('%H:%M:%S', time.localtime(r['started_at']))})" for r in reports}
+        selected = st.selectbox('Report', list(labels), format_func=labels.get)
+        report = next(r for r in reports if r['id'] == selected)
+        st.code(report['summary'])
+        if os.path.exists(report['path']):
+            with open(report['path'], 'rb') as f:
+                st.download_button('Download .prof', f.read(), file_name=os.path.basename(report['path']))
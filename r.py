@@ -1,31 +1,26 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
-import calendar
 from datetime import datetime
 import base64
 from io import BytesIO
 
-# Function to load data from Excel into a DataFrame with @st.cache_data
-@st.cache_data(hash_funcs={pd.DataFrame: lambda _: None})
-def load_data(file):
-    df = pd.read_excel(file)
-    df.rename(columns={'bani_Manager_Column_Name': 'Manager Name', 'bani_SPOC_Column_Name': 'SPOC Name'}, inplace=True)
-    return df
-
-# Function to create SQLite database table for appointments
+from admin import metrics_panel
+from bookings import BOOKINGS_DB, book_slot, bookings_in_month, bookings_on
+from calendar_view import generate_calendar
+from db import connection
+from directory import manager_directory
+from exports import csv_download_button
+from metrics import span
+from migrations import ensure_schema
+from profiling import maybe_profile, profiles_panel
+from storage import SQLiteStudentStore
+from students import STUDENT_COLUMNS, delete_students
+from upload_jobs import show_upload_progress, submit_upload
+from validation import clean_id_series
+
+# Function to bring the SQLite databases to the current schema (once per process)
 def create_table():
-    conn = sqlite3.connect('slot_booking_new.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS appointment_bookings
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 date TEXT,
-                 time_range TEXT,
-                 manager TEXT,
-                 spoc TEXT,
-                 booked_by TEXT)''')
-    conn.commit()
-    conn.close()
+    ensure_schema(BOOKINGS_DB, 'slide.db')
 
 # Function to insert booking into SQLite database
 def insert_booking(date, time_range, manager, spoc, booked_by):
@@ -54,129 +49,27 @@ def insert_booking(date, time_range, manager, spoc, booked_by):
         st.error('If Error Message Reflects Or To Book Slot On Holidays & Other Than Official Hours Please Contact To Pritam Basu & Kousik Dey.')
         return
 
-    conn = sqlite3.connect('slot_booking_new.db')
-    c = conn.cursor()
-
-    c.execute('''SELECT * FROM appointment_bookings 
-                 WHERE date = ? AND spoc = ?''', (date, spoc))
-    existing_booking = c.fetchone()
-
-    if existing_booking:
-        conn.close()
+    # The unique (date, spoc) index rejects double bookings, even from simultaneous clicks
+    if not book_slot(date, time_range, manager, spoc, booked_by):
         st.error('Slot booking failed. This SPOC is already booked for the selected date.')
         return
 
-    c.execute('''INSERT INTO appointment_bookings (date, time_range, manager, spoc, booked_by)
-                 VALUES (?, ?, ?, ?, ?)''', (date, time_range, manager, spoc, booked_by))
-    conn.commit()
-    conn.close()
     st.success('Slot booked successfully!')
 
 # Function to update another database from uploaded Excel file
 def update_another_database(file):
-    df = pd.read_excel(file)
-
-    conn = sqlite3.connect('slide.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS bani
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 cmis_id TEXT,
-                 student_name TEXT,
-                 cmis_ph_no TEXT,
-                 center_name TEXT,
-                 uploader_name TEXT,
-                 verification_type TEXT,
-                 mode_of_verification TEXT,
-                 date_of_verification TEXT)''')
-    conn.commit()
-
-    for index, row in df.iterrows():
-        c.execute('''INSERT INTO bani (cmis_id, student_name, cmis_ph_no, center_name, uploader_name, verification_type, mode_of_verification, date_of_verification)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', (row['CMIS ID'], row['Student Name'], row['CMIS PH No(10 Number)'],
-                                                row['Center Name'], row['Name Of Uploder'], row['Verification Type'], row['Mode Of Verification'], row['Date Of Verification']))
-    conn.commit()
-    conn.close()
-
-    st.success('Data updated successfully!')
+    # Rows are read from the workbook and committed in batches on a background worker
+    st.query_params['upload_job'] = submit_upload(file, SQLiteStudentStore('slide.db', 'bani', {**STUDENT_COLUMNS, 'Date Of Verification': 'verification_date'}))
 
 # Function to download data from slide.db
 def download_another_database_data():
-    conn = sqlite3.connect('slide.db')
-    df = pd.read_sql_query("SELECT * FROM bani", conn)
-    conn.close()
-    
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="bani.csv">Download CSV</a>'
-    st.markdown(href, unsafe_allow_html=True)
-
-# Function to generate HTML for calendar view with bookings highlighted
-def generate_calendar(bookings):
-    cal = calendar.Calendar()
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-    weekday_names = list(calendar.day_abbr)
-
-    days_html = ''
-    for day in cal.itermonthdays(current_year, current_month):
-        if day == 0:
-            days_html += '<div class="day"></div>'
-        else:
-            date = pd.Timestamp(year=current_year, month=current_month, day=day)
-            bookings_on_day = bookings[(bookings['date'].dt.year == current_year) &
-                                       (bookings['date'].dt.month == current_month) &
-                                       (bookings['date'].dt.day == day)]
-
-            if date.weekday() == 6:
-                day_style = 'background-color: red;'
-            elif not bookings_on_day.empty:
-                day_style = 'background-color: #b3e6b3;'
-            else:
-                day_style = ''
-
-            days_html += f'<div class="day" style="{day_style}"><span class="day-number">{day}</span><br>{weekday_names[date.weekday()]}</div>'
-
-    calendar_html = f"""
-    <style>
-        .calendar {{
-            display: grid;
-            grid-template-columns: repeat(7, 1fr);
-            gap: 10px;
-            margin-top: 20px;
-        }}
-        .day {{
-            padding: 10px;
-            border: 1px solid #ccc;
-            text-align: center;
-        }}
-        .booking {{
-            background-color: #b3e6b3;
-            padding: 5px;
-            font-size: 0.8em;
-        }}
-        .day-number {{
-            font-size: 1.2em;
-            font-weight: bold;
-        }}
-    </style>
-    <div class="calendar">
-        {days_html}
-    </div>
-    """
-
-    return calendar_html
+    csv_download_button('Download CSV', 'slide.db', "SELECT * FROM bani", 'bani.csv')
 
 # Function to bulk delete data from bani table in slide.db by cmis_id
 def bulk_delete_bani(cmis_ids):
-    conn = sqlite3.connect('slide.db')
-    c = conn.cursor()
-    
-    for cmis_id in cmis_ids:
-        c.execute("DELETE FROM bani WHERE cmis_id = ?", (cmis_id,))
-    
-    conn.commit()
-    conn.close()
-    st.success("Selected records deleted successfully.")
+    with connection('slide.db') as conn:
+        deleted = delete_students(conn, 'bani', cmis_ids)
+    st.success(f"{deleted} records deleted successfully.")
 
 import xlsxwriter  # Import xlsxwriter module
 
@@ -232,15 +125,14 @@ def main():
     # Ensure table exists in SQLite database
     create_table()
 
-    # Load data using st.cache_data
-    data = load_data('managers_spocs.xlsx')
+    # Compiled once per change of managers_spocs.xlsx and shared by every session
+    directory = manager_directory('managers_spocs.xlsx', (('bani_Manager_Column_Name', 'Manager Name'), ('bani_SPOC_Column_Name', 'SPOC Name')))
 
     # Manager selection
-    selected_manager = st.selectbox('Select Manager', data['Manager Name'].unique())
+    selected_manager = st.selectbox('Select Manager', directory.managers)
 
     # SPOC selection based on selected manager
-    spocs_for_manager = data[data['Manager Name'] == selected_manager]['SPOC Name'].tolist()
-    selected_spoc = st.selectbox('Select SPOC', spocs_for_manager)
+    selected_spoc = st.selectbox('Select SPOC', directory.spocs(selected_manager))
 
     # Date selection
     selected_date = st.date_input('Select Date')
@@ -256,12 +148,12 @@ def main():
     # Upload Excel file and update another database
     st.subheader('Upload Student Data For SPOC Calling')
     file = st.file_uploader('Upload Excel', type=['xlsx', 'xls'])
-    data_uploaded = st.session_state.get('data_uploaded', False)
     if file is not None:
         if st.button('Update Data'):
             update_another_database(file)
-            st.session_state['data_uploaded'] = True
-            data_uploaded = True
+    # Set once an upload job has finished with valid rows
+    show_upload_progress()
+    data_uploaded = st.session_state.get('data_uploaded', False)
 
     # Only allow booking if data is uploaded
     if not data_uploaded:
@@ -280,30 +172,19 @@ def main():
     if st.button('Download Data For M&E Purpose'):
         download_another_database_data()
 
-    # Fetch all bookings
-    conn = sqlite3.connect('slot_booking_new.db')
-    bookings = pd.read_sql_query("SELECT * FROM appointment_bookings", conn)
-    conn.close()
-
-    if 'date' in bookings.columns:
-        bookings['date'] = pd.to_datetime(bookings['date'])
+    # Fetch this month's bookings only; the calendar never shows other months
+    now = datetime.now()
+    bookings = bookings_in_month(now.year, now.month)
 
     # Show calendar after booking attempt
     st.subheader('Calendar View (Current Month Status)')
-    st.markdown(generate_calendar(bookings), unsafe_allow_html=True)
+    st.markdown(generate_calendar(bookings, now), unsafe_allow_html=True)
 
     # Display today's bookings
     st.header("Today's Bookings")
 
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    conn = sqlite3.connect('slot_booking_new.db')
-    c = conn.cursor()
-    c.execute(
-        "SELECT date, time_range, manager, spoc FROM appointment_bookings WHERE date = ?",
-        (current_date,)
-    )
-    today_booking_details = c.fetchall()
-    conn.close()
+    current_date = now.strftime("%Y-%m-%d")
+    today_booking_details = bookings_on(now.date())
 
     if today_booking_details:
         st.write(f"Bookings for today ({current_date}):")
@@ -314,20 +195,20 @@ def main():
 
     # Download button for monthly data
     if st.button('Download Monthly Data'):
-        csv = bookings.to_csv(index=False)
-        b64 = base64.b64encode(csv.encode()).decode()
-        href = f'<a href="data:file/csv;base64,{b64}" download="monthly_bookings.csv">Download CSV</a>'
-        st.markdown(href, unsafe_allow_html=True)
+        csv_download_button('Download CSV', 'slot_booking_new.db', "SELECT * FROM appointment_bookings", 'monthly_bookings.csv')
 
     # Bulk delete student data
     st.header('Bulk Delete Student Data')
     file = st.file_uploader('Upload CSV with CMIS IDs to delete', type=['csv'])
     if file is not None:
         cmis_ids_df = pd.read_csv(file)
-        cmis_ids = cmis_ids_df['cmis_id'].tolist()
+        cmis_ids = clean_id_series(cmis_ids_df['cmis_id'].dropna())
         if st.button('Delete Records'):
             bulk_delete_bani(cmis_ids)
 
 # Run the app
 if __name__ == '__main__':
-    main()
+    with span('rerun.r'), maybe_profile('r'):
+        main()
+    metrics_panel()
+    profiles_panel()
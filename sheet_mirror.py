@@ -0,0 +1,215 @@
+import json
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+from db import connection
+from sheets import with_backoff
+
+MIRROR_DB = 'sheets_mirror.db'
+# Appended rows are picked up incrementally; edits to older rows are only seen on a full resync,
+# which sheets_client runs in the background once the last one is this many seconds old
+FULL_RESYNC_INTERVAL = 600
+
+# Worksheet -> indexes created on its mirror table (skipped when the worksheet lacks a column)
+MIRROR_INDEXES = {
+    'slot_booking_new': {
+        'date': 'date',
+        'date_spoc': 'date, lower(trim(spoc))',
+    },
+    'plana': {
+        'cmis_id': 'cmis_id',
+        'verification_date': 'verification_date',
+    },
+}
+
+# Worksheet -> lock held for a whole sync, so concurrent sessions never rebuild one mirror table twice
+_sync_locks = {}
+_sync_locks_guard = threading.Lock()
+
+
+def _table(worksheet_name):
+    return f'"mirror_{worksheet_name}"'
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _ensure_state(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS mirror_state
+                    (worksheet TEXT PRIMARY KEY,
+                    columns TEXT,
+                    synced_rows INTEGER,
+                    full_synced_at REAL)''')
+
+
+def _recreate_table(conn, worksheet_name, columns):
+    conn.execute(f'DROP TABLE IF EXISTS {_table(worksheet_name)}')
+    column_defs = ', '.join(f'{_quote(c)} TEXT' for c in columns)
+    conn.execute(f'CREATE TABLE {_table(worksheet_name)} (row_number INTEGER PRIMARY KEY, {column_defs})')
+
+    for name, exprs in MIRROR_INDEXES.get(worksheet_name, {}).items():
+        try:
+            conn.execute(f'CREATE INDEX "idx_mirror_{worksheet_name}_{name}" ON {_table(worksheet_name)} ({exprs})')
+        except sqlite3.OperationalError:
+            pass
+
+
+def _read_state(worksheet_name):
+    with connection(MIRROR_DB) as conn:
+        _ensure_state(conn)
+        return conn.execute('SELECT columns, synced_rows, full_synced_at FROM mirror_state WHERE worksheet = ?',
+                            (worksheet_name,)).fetchone()
+
+
+def _lock(worksheet_name):
+    with _sync_locks_guard:
+        return _sync_locks.setdefault(worksheet_name, threading.Lock())
+
+
+def _plan(worksheet_name, full=False):
+    """(full, columns, first_row, state) of the next sync of `worksheet_name`.
+
+    The first sync, and a `full` one, reads the whole worksheet; otherwise only the rows
+    below the last mirrored row are read.
+    """
+    state = _read_state(worksheet_name)
+    if full or state is None or not json.loads(state[0]):
+        return True, [], 0, state
+    return False, json.loads(state[0]), state[1], state
+
+
+def resync_due(worksheet_name):
+    """Whether the last full read of `worksheet_name` is over FULL_RESYNC_INTERVAL seconds old."""
+    state = _read_state(worksheet_name)
+    return state is not None and time.time() - state[2] > FULL_RESYNC_INTERVAL
+
+
+def _cells(plan):
+    """The A1 cell range a sync plan reads, without the worksheet name ('' for the whole worksheet)."""
+    full, columns, first_row, _ = plan
+    if full:
+        return ''
+    return f'A{first_row + 2}:{rowcol_to_a1(1, len(columns))[:-1]}'
+
+
+def _apply(worksheet_name, plan, values):
+    """Write the `values` read for `plan` into the mirror; return the mirrored row count."""
+    full, columns, first_row, state = plan
+    if full:
+        columns, rows = (values[0], values[1:]) if values else ([], [])
+        # get_all_values pads the header to the widest row
+        while columns and not columns[-1]:
+            columns = columns[:-1]
+    else:
+        rows = values
+
+    width = len(columns)
+    rows = [list(row[:width]) + [''] * (width - len(row)) for row in rows]
+
+    with connection(MIRROR_DB) as conn:
+        # Explicit, because sqlite3 would commit the DROP and CREATE of a full sync on their
+        # own; readers see the old mirror until the new one is complete
+        conn.execute('BEGIN IMMEDIATE')
+        _ensure_state(conn)
+        if full and columns:
+            _recreate_table(conn, worksheet_name, columns)
+        if rows and columns:
+            placeholders = ', '.join('?' * (width + 1))
+            conn.executemany(f'INSERT OR REPLACE INTO {_table(worksheet_name)} VALUES ({placeholders})',
+                             ([first_row + i + 1] + row for i, row in enumerate(rows)))
+        synced_rows = first_row + len(rows)
+        full_synced_at = time.time() if full else state[2]
+        conn.execute('INSERT OR REPLACE INTO mirror_state (worksheet, columns, synced_rows, full_synced_at) VALUES (?, ?, ?, ?)',
+                     (worksheet_name, json.dumps(columns), synced_rows, full_synced_at))
+    return synced_rows
+
+
+def sync_worksheet(ws, worksheet_name, full=False):
+    """Copy rows appended to `ws` since the last sync into the local mirror; return the mirrored row count.
+
+    A `full` sync rereads the whole worksheet, to pick up edits to older rows. Its download
+    runs outside the sync lock, so incremental syncs of the worksheet are not held up by it.
+    The rows appended while it ran are read under the lock and written in the same
+    transaction as the snapshot, so no reader ever sees the mirror without rows it had.
+    """
+    if full:
+        values = with_backoff(ws.get_all_values)
+        with _lock(worksheet_name):
+            if values:
+                width = len(values[0])
+                while width and not values[0][width - 1]:
+                    width -= 1
+                if width:
+                    tail = f'A{len(values) + 1}:{rowcol_to_a1(1, width)[:-1]}'
+                    values = values + with_backoff(lambda: ws.get(tail))
+            return _apply(worksheet_name, _plan(worksheet_name, full=True), values)
+    with _lock(worksheet_name):
+        plan = _plan(worksheet_name)
+        cells = _cells(plan)
+        values = with_backoff(lambda: ws.get(cells) if cells else ws.get_all_values())
+        return _apply(worksheet_name, plan, values)
+
+
+def forget_mirror(worksheet_name):
+    """Make the next sync of `worksheet_name` read the whole worksheet again."""
+    with _lock(worksheet_name):
+        with connection(MIRROR_DB) as conn:
+            _ensure_state(conn)
+            conn.execute('DELETE FROM mirror_state WHERE worksheet = ?', (worksheet_name,))
+
+
+def a1_range(worksheet_name, cells=''):
+    """`cells` of a worksheet in A1 notation, e.g. 'plana'!A2:I; the whole worksheet without `cells`."""
+    name = "'" + worksheet_name.replace("'", "''") + "'"
+    return f'{name}!{cells}' if cells else name
+
+
+def sync_worksheets(worksheet_names, batch_get):
+    """Sync several worksheets from one read; return {worksheet: mirrored row count}.
+
+    `batch_get(ranges)` reads a list of A1 ranges (see a1_range) and returns one list of rows
+    per range, e.g. with a single values:batchGet request.
+    """
+    names = sorted(set(worksheet_names))
+    locks = [_lock(name) for name in names]   # taken in name order, so two batches cannot deadlock
+    for lock in locks:
+        lock.acquire()
+    try:
+        plans = {name: _plan(name) for name in names}
+        values = batch_get([a1_range(name, _cells(plans[name])) for name in names])
+        return {name: _apply(name, plans[name], rows) for name, rows in zip(names, values)}
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
+def mirror_frame(worksheet_name, where='', params=()):
+    """Read mirrored rows (optionally filtered by a SQL `where` clause) as a DataFrame."""
+    state = _read_state(worksheet_name)
+    columns = json.loads(state[0]) if state else []
+    if not columns:
+        return pd.DataFrame()
+
+    select = ', '.join(_quote(c) for c in columns)
+    where = f'WHERE {where}' if where else ''
+    with connection(MIRROR_DB) as conn:
+        return pd.read_sql_query(f'SELECT {select} FROM {_table(worksheet_name)} {where} ORDER BY row_number',
+                                 conn, params=params)
+
+
+def mirror_has_row(worksheet_name, where, params=()):
+    state = _read_state(worksheet_name)
+    if not state or not json.loads(state[0]):
+        return False
+    with connection(MIRROR_DB) as conn:
+        return conn.execute(f'SELECT 1 FROM {_table(worksheet_name)} WHERE {where} LIMIT 1', params).fetchone() is not None
+
+
+def mirror_row_count(worksheet_name):
+    state = _read_state(worksheet_name)
+    return state[1] if state else 0
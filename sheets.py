@@ -0,0 +1,131 @@
+import random
+import time
+
+import gspread
+import requests
+
+from metrics import increment, span
+
+# Size bounds for one append request; Sheets rejects very large payloads
+CHUNK_ROWS = 500
+CHUNK_BYTES = 1_000_000
+
+# Truncated exponential backoff for quota (429) and server (5xx) errors
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 32.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ChunkedAppendError(Exception):
+    """An append stopped partway; `next_chunk` is the first chunk the server did not acknowledge."""
+
+    def __init__(self, next_chunk, total_chunks, cause):
+        super().__init__(f'Upload stopped at chunk {next_chunk + 1} of {total_chunks}: {cause}')
+        self.next_chunk = next_chunk
+        self.total_chunks = total_chunks
+        self.cause = cause
+
+
+def _status(exc):
+    response = getattr(exc, 'response', None)
+    return response.status_code if isinstance(exc, gspread.exceptions.APIError) and response is not None else None
+
+
+def is_retryable(exc):
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    return _status(exc) in RETRYABLE_STATUS
+
+
+def is_refused(exc):
+    """True for a 429: the request was turned away before anything it carried was applied."""
+    return _status(exc) == 429
+
+
+def _backoff(attempt, sleep):
+    increment('sheets.retries')
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    sleep(delay + random.uniform(0, delay / 2))
+
+
+def with_backoff(call, retries=MAX_RETRIES, sleep=time.sleep):
+    """Run `call()`, retrying retryable Sheets errors with jittered exponential backoff.
+
+    Only for calls that are safe to repeat; appends go through append_once().
+    """
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except Exception as exc:
+            if attempt == retries or not is_retryable(exc):
+                raise
+            _backoff(attempt, sleep)
+
+
+def rows_landed(ws, rows, first_row):
+    """Whether `rows` are already in `ws` at or below sheet row `first_row` (1-based).
+
+    Rows are recognised by their first cell, the row id in every worksheet this app writes.
+    """
+    ids = [str(row[0]) for row in rows]
+    column = [cells[0] if cells else '' for cells in with_backoff(lambda: ws.get(f'A{first_row}:A'))]
+    return any(column[i:i + len(ids)] == ids for i in range(len(column) - len(ids) + 1))
+
+
+def append_once(ws, rows, first_row, value_input_option='RAW', retries=MAX_RETRIES, sleep=time.sleep):
+    """Append `rows` to `ws`, expected at sheet row `first_row`, without ever writing them twice.
+
+    An append is not idempotent: after a 5xx, a dropped connection or a timeout the rows may
+    have been written anyway. Only 429s are retried straight away; after any other retryable
+    error the worksheet is checked first (rows_landed) and the append is repeated only if
+    the rows are not there.
+    """
+    for attempt in range(retries + 1):
+        try:
+            ws.append_rows(rows, value_input_option=value_input_option)
+            return
+        except Exception as exc:
+            if attempt == retries or not is_retryable(exc):
+                raise
+            if not is_refused(exc) and rows_landed(ws, rows, first_row):
+                increment('sheets.appends_landed')
+                return
+            _backoff(attempt, sleep)
+
+
+def chunk_rows(rows, max_rows=CHUNK_ROWS, max_bytes=CHUNK_BYTES):
+    """Split `rows` into lists bounded by row count and by approximate payload size."""
+    chunks = []
+    current, current_bytes = [], 0
+    for row in rows:
+        row_bytes = sum(len(str(value)) + 3 for value in row) + 2
+        if current and (len(current) >= max_rows or current_bytes + row_bytes > max_bytes):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(row)
+        current_bytes += row_bytes
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def append_rows_chunked(ws, chunks, first_row, start_chunk=0, progress=None, value_input_option='USER_ENTERED'):
+    """Append pre-split `chunks` to `ws`, starting at `start_chunk`.
+
+    `first_row` is the sheet row the first row of `chunks[0]` is expected at (see append_once).
+    `progress(done_chunks, total_chunks)` is called after each acknowledged chunk. If a chunk
+    still fails after retries, ChunkedAppendError tells the caller where to resume.
+    """
+    total = len(chunks)
+    row = first_row + sum(len(chunk) for chunk in chunks[:start_chunk])
+    for index in range(start_chunk, total):
+        try:
+            with span('sheets.append_rows'):
+                append_once(ws, chunks[index], row, value_input_option)
+        except Exception as exc:
+            raise ChunkedAppendError(index, total, exc) from exc
+        row += len(chunks[index])
+        if progress is not None:
+            progress(index + 1, total)
+    return total
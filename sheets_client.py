@@ -0,0 +1,325 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import gspread
+import streamlit as st
+from google.auth.transport.requests import AuthorizedSession, Request
+from gspread.utils import convert_credentials, extract_id_from_url
+from oauth2client.service_account import ServiceAccountCredentials
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from cache_namespaces import generation
+from metrics import increment, span, timed
+from sheet_mirror import forget_mirror, resync_due, sync_worksheet, sync_worksheets
+from sheets import ChunkedAppendError, with_backoff
+
+# A synced worksheet is trusted for this many seconds unless a write bumped its generation
+SYNC_TTL = 15
+
+# Worksheet -> (rows, header) used when the worksheet has to be created
+WORKSHEETS = {
+    'slot_booking_new': (1000, ["id", "date", "time_range", "manager", "spoc", "booked_by"]),
+    'plana': (5000, ["id", "cmis_id", "student_name", "cmis_ph_no", "center_name",
+                     "uploader_name", "verification_type", "mode_of_verification", "verification_date"]),
+}
+
+# Worksheets the booking page reads, fetched together on a cold render
+PAGE_WORKSHEETS = ('slot_booking_new', 'plana')
+
+# Worksheet -> (generation, synced at, row count); shared by every session and upload worker
+_synced = {}
+_synced_lock = threading.Lock()
+
+# Per-worksheet fetches that cannot be batched, and token refreshes, run side by side here
+_fetch_pool = ThreadPoolExecutor(max_workers=len(WORKSHEETS), thread_name_prefix='sheets-fetch')
+
+# Periodic full resyncs (see sheet_mirror.FULL_RESYNC_INTERVAL) run here, off the render path
+_resync_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sheets-resync')
+_resyncing = set()
+_resyncing_lock = threading.Lock()
+
+# Keep-alive connections to the Sheets API shared by every session and upload worker
+HTTP_POOL_SIZE = 16
+# (connect, read) seconds before a request is abandoned; sheets.with_backoff retries timeouts
+HTTP_TIMEOUT = (10, 120)
+# The OAuth token is refreshed in the background once it expires within this many seconds
+TOKEN_REFRESH_AHEAD = 600
+
+# The process-wide client and its credentials; built on first use
+_client = None
+_credentials = None
+_token_request = None
+_token_refresh = None   # Future of the background token refresh in flight
+_client_lock = threading.Lock()
+
+# (spreadsheet url, worksheet name) -> worksheet handle; (url, None) -> spreadsheet handle
+_handles = {}
+_handles_lock = threading.Lock()
+
+
+# --- GOOGLE SHEETS CONNECTION SETUP ---
+def _service_account_credentials():
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+    try:
+        creds_dict = {
+            "type": st.secrets["connections"]["gsheets"]["type"],
+            "project_id": st.secrets["connections"]["gsheets"]["project_id"],
+            "private_key_id": st.secrets["connections"]["gsheets"]["private_key_id"],
+            "private_key": st.secrets["connections"]["gsheets"]["private_key"],
+            "client_email": st.secrets["connections"]["gsheets"]["client_email"],
+            "client_id": st.secrets["connections"]["gsheets"]["client_id"],
+            "auth_uri": st.secrets["connections"]["gsheets"]["auth_uri"],
+            "token_uri": st.secrets["connections"]["gsheets"]["token_uri"],
+            "auth_provider_x509_cert_url": st.secrets["connections"]["gsheets"]["auth_provider_x509_cert_url"],
+            "client_x509_cert_url": st.secrets["connections"]["gsheets"]["client_x509_cert_url"]
+        }
+    except KeyError:
+        st.error("### ❌ Secrets Configuration Error\n"
+                 "Streamlit could not find the `[connections.gsheets]` structure in your secrets.\n\n"
+                 "Please verify that your configuration file matches the format you provided.")
+        st.stop()
+
+    return convert_credentials(ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope))
+
+
+def _connect():
+    """A gspread client whose requests share one pool of keep-alive connections."""
+    global _credentials, _token_request
+    if os.environ.get('SLBOOK_FAKE_SHEETS'):
+        # In-process stand-in for offline runs and the rerun benchmarks (see fake_gspread.py)
+        import fake_gspread
+        return fake_gspread.FakeClient()
+
+    credentials = _service_account_credentials()
+    _token_request = Request()
+    # Fetch the first token now rather than inside the first data request
+    credentials.refresh(_token_request)
+    _credentials = credentials
+
+    session = AuthorizedSession(credentials)
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE))
+    client = gspread.authorize(None, session=session)
+    client.set_timeout(HTTP_TIMEOUT)
+    return client
+
+
+def _refresh_token():
+    with span('sheets.token_refresh'):
+        _credentials.refresh(_token_request)
+
+
+def _keep_token_fresh():
+    """Refresh the OAuth token in the background once it is within TOKEN_REFRESH_AHEAD seconds
+    of expiring, so no data request has to wait for a refresh (google-auth would otherwise
+    refresh it inline, minutes before expiry)."""
+    global _token_refresh
+    credentials = _credentials
+    if credentials is None or credentials.expiry is None:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None)   # google-auth keeps expiry as naive UTC
+    if credentials.expiry - now > timedelta(seconds=TOKEN_REFRESH_AHEAD):
+        return
+    with _client_lock:
+        if _token_refresh is None or _token_refresh.done():
+            _token_refresh = _fetch_pool.submit(_refresh_token)
+
+
+def get_gspread_client():
+    """The process-wide gspread client, shared by every session and upload worker."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = _connect()
+    _keep_token_fresh()
+    return _client
+
+def spreadsheet_url():
+    return st.secrets["connections"]["gsheets"]["spreadsheet"]
+
+
+def _create_worksheet(sheet, worksheet_name):
+    if worksheet_name not in WORKSHEETS:
+        raise gspread.exceptions.WorksheetNotFound(worksheet_name)
+    rows, header = WORKSHEETS[worksheet_name]
+    ws = with_backoff(lambda: sheet.add_worksheet(title=worksheet_name, rows=str(rows), cols="20"))
+    with_backoff(lambda: ws.append_row(header))
+    return ws
+
+
+def open_worksheet(worksheet_name, client, url):
+    """The cached handle of a worksheet of the spreadsheet at `url`.
+
+    The first call opens the spreadsheet and lists all of its worksheets (two metadata
+    requests per process); every later call is answered from the cache. A worksheet that
+    does not exist yet is created if it is one of WORKSHEETS.
+    """
+    key = (url, worksheet_name)
+    with _handles_lock:
+        if key not in _handles:
+            sheet = _handles.get((url, None))
+            if sheet is None:
+                sheet = _handles[(url, None)] = with_backoff(lambda: client.open_by_url(url))
+            for ws in with_backoff(sheet.worksheets):
+                _handles[(url, ws.title)] = ws
+            if key not in _handles:
+                _handles[key] = _create_worksheet(sheet, worksheet_name)
+        return _handles[key]
+
+
+@timed('sheets.get_worksheet')
+def get_worksheet(worksheet_name):
+    try:
+        return open_worksheet(worksheet_name, get_gspread_client(), spreadsheet_url())
+    except gspread.exceptions.WorksheetNotFound:
+        raise
+    except Exception as e:
+        if get_script_run_ctx() is None:
+            raise   # off the script thread (e.g. a resync or upload worker) st.stop() cannot end a run
+        st.error(f"### ❌ Connection Error\nCould not access the Google Spreadsheet URL. Details: {e}")
+        st.stop()
+
+
+def is_stale_handle(exc):
+    """Whether `exc` says a cached handle no longer names a worksheet (it was deleted or renamed)."""
+    if isinstance(exc, ChunkedAppendError):
+        # Only when nothing was appended, so the whole append can be repeated
+        return exc.next_chunk == 0 and is_stale_handle(exc.cause)
+    if isinstance(exc, gspread.exceptions.WorksheetNotFound):
+        return True
+    if isinstance(exc, gspread.exceptions.APIError):
+        return exc.code == 404 or (exc.code == 400 and 'Unable to parse range' in str(exc))
+    return False
+
+
+def forget_handles():
+    """Make the next open_worksheet() call reopen the spreadsheet."""
+    with _handles_lock:
+        _handles.clear()
+
+
+def with_worksheet(worksheet_name, call, worksheet=get_worksheet):
+    """Return `call(ws)` for the worksheet's handle.
+
+    If the handle turns out to be stale, the handles and the worksheet's mirror are
+    dropped and `call` is run once more on a freshly opened worksheet, so `call` must
+    be safe to repeat after a failure that is_stale_handle() accepts.
+    """
+    try:
+        return call(worksheet(worksheet_name))
+    except Exception as exc:
+        if not is_stale_handle(exc):
+            raise
+    increment('sheets.stale_handles')
+    forget_handles()
+    forget_mirror(worksheet_name)
+    with _synced_lock:
+        _synced.pop(worksheet_name, None)
+    return call(worksheet(worksheet_name))
+
+
+def batch_getter(client, url):
+    """A batch_get for sheet_mirror.sync_worksheets that reads every range in one values:batchGet.
+
+    The request goes straight to the values endpoint by spreadsheet id, so no metadata
+    request (open_by_url, worksheet) is made first.
+    """
+    spreadsheet_id = extract_id_from_url(url)
+
+    def batch_get(ranges):
+        with span('sheets.batch_get'):
+            response = with_backoff(lambda: client.http_client.values_batch_get(spreadsheet_id, ranges))
+        return [value_range.get('values', []) for value_range in response['valueRanges']]
+
+    return batch_get
+
+
+def batch_get_values(ranges):
+    return batch_getter(get_gspread_client(), spreadsheet_url())(ranges)
+
+
+def _fresh_rows(worksheet_name, current):
+    """The row count of the last sync if it is still fresh, else None."""
+    with _synced_lock:
+        synced = _synced.get(worksheet_name)
+    if synced is not None and synced[0] == current and time.monotonic() - synced[1] < SYNC_TTL:
+        return synced[2]
+    return None
+
+
+def _record_sync(worksheet_name, current, rows):
+    with _synced_lock:
+        _synced[worksheet_name] = (current, time.monotonic(), rows)
+
+
+def _resync(worksheet_name, worksheet):
+    try:
+        with span(f'sheets.resync.{worksheet_name}'):
+            with_worksheet(worksheet_name, lambda ws: sync_worksheet(ws, worksheet_name, full=True), worksheet)
+    finally:
+        with _resyncing_lock:
+            _resyncing.discard(worksheet_name)
+
+
+def _schedule_resync(worksheet_name, worksheet):
+    """Start a background full resync of `worksheet_name` if one is due and not already running."""
+    with _resyncing_lock:
+        if worksheet_name in _resyncing or not resync_due(worksheet_name):
+            return
+        _resyncing.add(worksheet_name)
+    _resync_pool.submit(_resync, worksheet_name, worksheet)
+
+
+def sync_sheet(worksheet_name, worksheet=get_worksheet):
+    """Bring the local mirror of `worksheet_name` up to date; return its row count.
+
+    Pulls only rows appended since the last sync (see sheet_mirror.py), and skips the API
+    call entirely when the last sync is under SYNC_TTL seconds old and nothing was written
+    to the worksheet since (see cache_namespaces.py).
+    """
+    current = generation(worksheet_name)
+    rows = _fresh_rows(worksheet_name, current)
+    if rows is not None:
+        return rows
+
+    with span(f'sheets.sync.{worksheet_name}'):
+        rows = with_worksheet(worksheet_name, lambda ws: sync_worksheet(ws, worksheet_name), worksheet)
+    _record_sync(worksheet_name, current, rows)
+    _schedule_resync(worksheet_name, worksheet)
+    return rows
+
+
+def sync_sheets(worksheet_names=PAGE_WORKSHEETS, worksheet=get_worksheet, batch_get=batch_get_values):
+    """sync_sheet() for several worksheets at once, so a cold page costs one round-trip.
+
+    Every worksheet that is due is read with one batch request. If that request is refused
+    (e.g. a worksheet does not exist yet), the worksheets are synced one by one, concurrently,
+    through `worksheet`, which creates missing worksheets.
+    """
+    generations = {name: generation(name) for name in worksheet_names}
+    due = [name for name, current in generations.items() if _fresh_rows(name, current) is None]
+    if not due:
+        return
+
+    try:
+        with span('sheets.sync_batch'):
+            rows = sync_worksheets(due, batch_get)
+    except gspread.exceptions.APIError as exc:
+        if exc.code != 400:
+            raise
+        for future in [_fetch_pool.submit(sync_sheet, name, worksheet) for name in due]:
+            future.result()
+        return
+    for name in due:
+        _record_sync(name, generations[name], rows[name])
+        _schedule_resync(name, worksheet)
+
+
+def forget_syncs():
+    """Make the next sync_sheet() call of every worksheet hit the API."""
+    with _synced_lock:
+        _synced.clear()
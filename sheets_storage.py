@@ -0,0 +1,111 @@
+"""The Google Sheets storage backend (see storage.py).
+
+Kept apart from storage.py so that only deployments that select it need gspread and the
+Google auth libraries.
+"""
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+from bookings import month_bounds
+from cache_namespaces import invalidate
+from exports import frame_csv
+from metrics import span
+from sheet_mirror import mirror_frame, mirror_has_row, mirror_row_count, sync_worksheet
+from sheets import CHUNK_ROWS, append_once, append_rows_chunked, chunk_rows
+from sheets_client import PAGE_WORKSHEETS, batch_get_values, get_worksheet, sync_sheet, sync_sheets, with_worksheet
+from storage import BOOKING_COLUMNS, Backend, BookingStore, StudentStore
+from students import PLANA_COLUMNS, student_rows
+
+
+class SheetsBookingStore(BookingStore):
+    """Bookings in a worksheet; reads go to the local mirror, which sync_sheet() keeps current."""
+
+    def __init__(self, worksheet=get_worksheet, name='slot_booking_new'):
+        self.worksheet = worksheet
+        self.name = name
+        # Sheets has no unique constraint; checking and appending under one lock keeps two
+        # sessions of this server from booking the same SPOC and date at the same moment
+        self._book_lock = threading.Lock()
+
+    def book(self, date, time_range, manager, spoc, booked_by):
+        with self._book_lock:
+            sync_sheet(self.name, self.worksheet)
+            if mirror_has_row(self.name, 'date = ? AND lower(trim(spoc)) = ?', (str(date), str(spoc).strip().lower())):
+                return False
+
+            row = [mirror_row_count(self.name) + 1, date, time_range, manager, spoc, booked_by]
+            try:
+                with span('sheets.append_row'):
+                    # append_once repeats the append only if the row is not in the worksheet yet,
+                    # and a stale handle fails before anything is written, so neither double-books
+                    with_worksheet(self.name, lambda ws: append_once(ws, [row], row[0] + 1), self.worksheet)
+            finally:
+                invalidate(self.name)
+        return True
+
+    def _between(self, start, end):
+        sync_sheet(self.name, self.worksheet)
+        frame = mirror_frame(self.name, 'date >= ? AND date < ?', (str(start), str(end)))
+        return frame.reindex(columns=BOOKING_COLUMNS).sort_values('date', kind='stable', ignore_index=True)
+
+    def bookings_in_month(self, year, month):
+        bookings = self._between(*month_bounds(year, month))
+        bookings['date'] = pd.to_datetime(bookings['date'], errors='coerce')
+        return bookings
+
+    def bookings_on(self, day):
+        return tuple(self._between(day, day + timedelta(days=1)).itertuples(index=False, name=None))
+
+    def export_csv(self):
+        sync_sheet(self.name, self.worksheet)
+        return frame_csv(mirror_frame(self.name))
+
+
+class SheetsStudentStore(StudentStore):
+    # One batch is one append request (see sheets.CHUNK_ROWS), so progress is exact per request
+    batch_rows = CHUNK_ROWS
+
+    def __init__(self, worksheet=get_worksheet, name='plana', columns=PLANA_COLUMNS):
+        self.worksheet = worksheet
+        self.name = name
+        self.columns = columns
+        self.target = f'sheets:{name}'
+
+    def insert_batch(self, batch):
+        frame = student_rows(batch, self.columns)
+        values = [['' if value is None else str(value) for value in row] for row in frame.itertuples(index=False, name=None)]
+
+        def append(ws):
+            # Uncached incremental sync, so new ids continue from the rows that exist right now
+            next_id = sync_worksheet(ws, self.name) + 1
+            # Row n of the data is sheet row n + 1, below the header
+            append_rows_chunked(ws, chunk_rows([[next_id + i, *row] for i, row in enumerate(values)]), next_id + 1)
+
+        try:
+            with_worksheet(self.name, append, self.worksheet)
+        finally:
+            invalidate(self.name)
+        return len(values)
+
+    def export_csv(self, transform=None):
+        sync_sheet(self.name, self.worksheet)
+        return frame_csv(mirror_frame(self.name), transform)
+
+
+class SheetsBackend(Backend):
+    def __init__(self, worksheet, batch_get):
+        super().__init__('sheets', SheetsBookingStore(worksheet), SheetsStudentStore(worksheet))
+        self._worksheet = worksheet
+        self._batch_get = batch_get
+
+    def prefetch(self):
+        # Both worksheets in one values:batchGet instead of a metadata and a read request each
+        sync_sheets(PAGE_WORKSHEETS, self._worksheet, self._batch_get)
+
+
+def sheets_backend(worksheet=get_worksheet, batch_get=batch_get_values):
+    """`worksheet(name)` opens a worksheet and `batch_get(ranges)` reads several ranges at once;
+    benchmarks pass ones bound to a fake_gspread client (see sheets_client.batch_getter)."""
+    return SheetsBackend(worksheet, batch_get)
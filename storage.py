@@ -0,0 +1,252 @@
+"""Storage backends behind the booking page (booking_page.py).
+
+A backend bundles the three stores the page reads and writes:
+
+* bookings  - slot bookings: book, month and day queries, CSV export
+* students  - uploaded student verification rows: ingest, CSV export
+* directory - the manager -> SPOC lookup
+
+SQLite keeps everything in the local databases, Sheets in the Google Spreadsheet (read
+through the SQLite mirror, see sheets_storage.py and sheet_mirror.py), and memory in this
+process only, for demos, tests and benchmarks. get_backend() picks one from SLBOOK_BACKEND
+or the `backend` secret.
+"""
+import os
+import threading
+from datetime import timedelta
+
+import pandas as pd
+import streamlit as st
+
+from bookings import BOOKINGS_DB, book_slot, bookings_in_month, bookings_on, month_bounds
+from db import connection
+from directory import MANAGERS_FILE, manager_directory
+from exports import export_csv, frame_csv
+from ingest import INGEST_BATCH_ROWS, iter_upload_batches
+from migrations import ensure_schema
+from students import PLANA_COLUMNS, insert_students, student_rows
+
+BOOKING_COLUMNS = ['date', 'time_range', 'manager', 'spoc']
+DEFAULT_BACKEND = 'sqlite'
+
+
+class BookingStore:
+    """Where slot bookings live; dates are ISO text ('YYYY-MM-DD')."""
+
+    def book(self, date, time_range, manager, spoc, booked_by):
+        """Record a booking; return False if the SPOC is already booked on that date."""
+        raise NotImplementedError
+
+    def bookings_in_month(self, year, month):
+        """That month's bookings with `date` parsed, as generate_calendar expects; do not modify it."""
+        raise NotImplementedError
+
+    def bookings_on(self, day):
+        """(date, time_range, manager, spoc) tuples for one day."""
+        raise NotImplementedError
+
+    def export_csv(self):
+        """Every booking as CSV; return the rewound temporary file and its row count."""
+        raise NotImplementedError
+
+
+class StudentStore:
+    """Where uploaded student verification rows live.
+
+    Subclasses implement insert_batch() and export_csv(); ingest() is shared.
+    """
+
+    batch_rows = INGEST_BATCH_ROWS
+    target = ''   # shown in the upload job list
+
+    def insert_batch(self, batch):
+        """Store one DataFrame of upload rows (Excel headers); return the number of rows stored."""
+        raise NotImplementedError
+
+    def export_csv(self, transform=None):
+        """Every stored row as CSV, `transform` applied per chunk; return the rewound file and its row count."""
+        raise NotImplementedError
+
+    def ingest(self, file, keep=None, progress=None, skip_rows=0):
+        """Stream an uploaded file into the store, one batch of `batch_rows` rows at a time.
+
+        `keep(batch)` may filter each batch before it is stored. The first `skip_rows` kept rows
+        are passed over, so a failed upload can resume where it stopped. `progress(rows_read,
+        rows_inserted)` is called after each batch; skipped rows count as inserted.
+        Returns (rows read, rows inserted).
+        """
+        rows_read = rows_inserted = 0
+        for batch in iter_upload_batches(file, self.batch_rows):
+            rows_read += len(batch)
+            if keep is not None:
+                batch = keep(batch)
+            if skip_rows:
+                skipped = min(skip_rows, len(batch))
+                batch, skip_rows = batch.iloc[skipped:], skip_rows - skipped
+                rows_inserted += skipped
+            if not batch.empty:
+                rows_inserted += self.insert_batch(batch)
+            if progress is not None:
+                progress(rows_read, rows_inserted)
+        return rows_read, rows_inserted
+
+
+class Backend:
+    """The bookings store, student store and manager directory of one deployment."""
+
+    def __init__(self, name, bookings, students, directory=None):
+        self.name = name
+        self.bookings = bookings
+        self.students = students
+        self._directory = directory
+
+    def directory(self):
+        """The ManagerDirectory; read from managers_spocs.xlsx unless one was given."""
+        if self._directory is not None:
+            return self._directory
+        return manager_directory(MANAGERS_FILE)
+
+    def prefetch(self):
+        """Load what a page render reads before the render asks for it; a no-op for local stores."""
+
+
+# --- SQLITE ---
+class SQLiteBookingStore(BookingStore):
+    def __init__(self, path=BOOKINGS_DB):
+        self.path = path
+
+    def book(self, date, time_range, manager, spoc, booked_by):
+        return book_slot(date, time_range, manager, spoc, booked_by, self.path)
+
+    def bookings_in_month(self, year, month):
+        return bookings_in_month(year, month, self.path)
+
+    def bookings_on(self, day):
+        return bookings_on(day, self.path)
+
+    def export_csv(self):
+        return export_csv(self.path, 'SELECT * FROM appointment_bookings')
+
+
+class SQLiteStudentStore(StudentStore):
+    def __init__(self, path, table, columns=PLANA_COLUMNS):
+        self.path = path
+        self.table = table
+        self.columns = columns
+        self.target = f'{path}:{table}'
+
+    def insert_batch(self, batch):
+        # One transaction per batch, so the rows of a batch are committed together
+        with connection(self.path) as conn:
+            return insert_students(conn, self.table, batch, self.columns)
+
+    def export_csv(self, transform=None):
+        return export_csv(self.path, f'SELECT * FROM {self.table}', transform=transform)
+
+
+# --- IN MEMORY ---
+class MemoryBookingStore(BookingStore):
+    """Bookings held in this process, grouped by date; lost on restart."""
+
+    def __init__(self):
+        self._by_date = {}   # date -> list of (date, time_range, manager, spoc, booked_by)
+        self._keys = set()   # (date, normalised SPOC), as the SQLite unique index
+        self._lock = threading.Lock()
+
+    def book(self, date, time_range, manager, spoc, booked_by):
+        key = (str(date), str(spoc).strip().lower())
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+            self._by_date.setdefault(str(date), []).append((str(date), time_range, manager, spoc, booked_by))
+        return True
+
+    def _rows_between(self, start, end):
+        with self._lock:
+            return [row[:4] for day in sorted(self._by_date) if str(start) <= day < str(end)
+                    for row in self._by_date[day]]
+
+    def bookings_in_month(self, year, month):
+        bookings = pd.DataFrame(self._rows_between(*month_bounds(year, month)), columns=BOOKING_COLUMNS)
+        bookings['date'] = pd.to_datetime(bookings['date'])
+        return bookings
+
+    def bookings_on(self, day):
+        return tuple(self._rows_between(day, day + timedelta(days=1)))
+
+    def export_csv(self):
+        with self._lock:
+            rows = [row for day in sorted(self._by_date) for row in self._by_date[day]]
+        frame = pd.DataFrame(rows, columns=[*BOOKING_COLUMNS, 'booked_by'])
+        frame.insert(0, 'id', range(1, len(frame) + 1))
+        return frame_csv(frame)
+
+
+class MemoryStudentStore(StudentStore):
+    def __init__(self, columns=PLANA_COLUMNS):
+        self.columns = columns
+        self.target = 'memory'
+        self._frames = []
+        self._lock = threading.Lock()
+
+    def insert_batch(self, batch):
+        frame = student_rows(batch, self.columns)
+        with self._lock:
+            self._frames.append(frame)
+        return len(frame)
+
+    def _frame(self):
+        with self._lock:
+            frames = list(self._frames)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(self.columns.values()))
+
+    def export_csv(self, transform=None):
+        return frame_csv(self._frame(), transform)
+
+
+# --- SELECTION ---
+def sqlite_backend(bookings_db=BOOKINGS_DB, students_db='Plana.db', table='plana'):
+    ensure_schema(bookings_db, students_db)
+    return Backend('sqlite', SQLiteBookingStore(bookings_db), SQLiteStudentStore(students_db, table))
+
+
+def sheets_backend(*args, **kwargs):
+    # Imported here so SQLite and in-memory deployments run without the Google client libraries
+    from sheets_storage import sheets_backend
+    return sheets_backend(*args, **kwargs)
+
+
+def memory_backend(directory=None):
+    return Backend('memory', MemoryBookingStore(), MemoryStudentStore(), directory)
+
+
+BACKENDS = {
+    'sqlite': sqlite_backend,
+    'sheets': sheets_backend,
+    'memory': memory_backend,
+}
+
+# Backend name -> Backend, built once per process so every session shares the in-memory stores
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def backend_name():
+    """The backend configured by SLBOOK_BACKEND or the `backend` secret, else DEFAULT_BACKEND."""
+    name = os.environ.get('SLBOOK_BACKEND')
+    # Reading st.secrets without a secrets.toml puts an error box on the page
+    if not name and st.secrets.load_if_toml_exists():
+        name = st.secrets.get('backend')
+    return name or DEFAULT_BACKEND
+
+
+def get_backend(name=None):
+    """The process-wide backend called `name` (default: backend_name())."""
+    name = name or backend_name()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
@@ -0,0 +1,85 @@
+# Uploaded Excel header -> student table column, shared by every upload form
+STUDENT_COLUMNS = {
+    'CMIS ID': 'cmis_id',
+    'Student Name': 'student_name',
+    'CMIS PH No(10 Number)': 'cmis_ph_no',
+    'Center Name': 'center_name',
+    'Name Of Uploder': 'uploader_name',
+    'Verification Type': 'verification_type',
+    'Mode Of Verification': 'mode_of_verification',
+}
+
+# Upload columns of the plana tables and worksheet, which also record the verification date
+PLANA_COLUMNS = {**STUDENT_COLUMNS, 'Verification Date': 'verification_date'}
+
+# Column layout shared by every student table (plana, bani, studentcap)
+STUDENT_TABLE_COLUMNS = [
+    ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    ('cmis_id', 'TEXT'),
+    ('student_name', 'TEXT'),
+    ('cmis_ph_no', 'TEXT'),
+    ('center_name', 'TEXT'),
+    ('uploader_name', 'TEXT'),
+    ('verification_type', 'TEXT'),
+    ('mode_of_verification', 'TEXT'),
+    ('verification_date', 'TEXT'),
+]
+
+# Index name suffix -> indexed column, created on every student table
+STUDENT_INDEXES = {
+    'cmis_id': 'cmis_id',
+    'verification_date': 'verification_date',
+    'center_name': 'center_name',
+}
+
+
+def create_student_table(conn, table, extra_columns=()):
+    columns = [*STUDENT_TABLE_COLUMNS, *((name, 'TEXT') for name in extra_columns)]
+    # Quoted, as extra columns may be uploaded headers with spaces or brackets
+    definitions = ', '.join(f'"{name}" {kind}' for name, kind in columns)
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({definitions})')
+
+
+def ensure_student_indexes(conn, table):
+    for suffix, column in STUDENT_INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{suffix} ON {table} ({column})')
+
+
+def student_rows(df, columns=STUDENT_COLUMNS):
+    """Select and rename the upload columns in one step; missing cells become NULL.
+
+    Optional columns (e.g. 'Verification Date') may be missing from an upload; they stay NULL too.
+    """
+    frame = df.reindex(columns=list(columns)).rename(columns=columns)
+    # sqlite3 cannot bind pandas Timestamps; store dates as ISO text instead
+    for name in frame.select_dtypes(include=['datetime', 'datetimetz']).columns:
+        frame[name] = frame[name].astype(str).where(frame[name].notna())
+    return frame.astype(object).where(frame.notna(), None)
+
+
+def insert_students(conn, table, df, columns=STUDENT_COLUMNS):
+    """Insert every row of `df` into `table` with a single executemany; return the row count.
+
+    Runs inside the caller's transaction; the upload stores commit one batch at a time.
+    """
+    frame = student_rows(df, columns)
+    placeholders = ', '.join('?' * len(frame.columns))
+    conn.executemany(f'INSERT INTO {table} ({", ".join(frame.columns)}) VALUES ({placeholders})',
+                     frame.itertuples(index=False, name=None))
+    return len(frame)
+
+
+def delete_students(conn, table, cmis_ids):
+    """Delete every row of `table` whose cmis_id is in `cmis_ids`; return the number deleted.
+
+    The IDs go into a temp table first, so the whole list is removed by one DELETE that
+    probes the cmis_id index, instead of one full table scan per ID.
+    """
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_cmis_id ON {table} (cmis_id)')
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS delete_ids (cmis_id TEXT PRIMARY KEY) WITHOUT ROWID')
+    try:
+        conn.executemany('INSERT OR IGNORE INTO temp.delete_ids VALUES (?)', ((cmis_id,) for cmis_id in cmis_ids))
+        cur = conn.execute(f'DELETE FROM {table} WHERE cmis_id IN (SELECT cmis_id FROM temp.delete_ids)')
+        return cur.rowcount
+    finally:
+        conn.execute('DELETE FROM temp.delete_ids')
@@ -1,74 +1,65 @@
-import sqlite3
 import pandas as pd
 import streamlit as st
 
+from bookings import ensure_bookings_schema
+from db import connection, data_version
+from exports import write_csv
+from ingest import replace_table_from_upload
+from jobs import export_download
+from migrations import unify_student_table
+from students import ensure_student_indexes
+
 # Function to upload and update slot_booking_new.db with CSV or Excel data
 def upload_slot_booking(file):
     file_extension = file.name.split('.')[-1]
-    
-    # Read the file based on its extension
-    if file_extension == 'csv':
-        df = pd.read_csv(file)
-    elif file_extension in ['xls', 'xlsx']:
-        df = pd.read_excel(file)
-    else:
+    if file_extension not in ['csv', 'xls', 'xlsx']:
         st.error("Unsupported file format")
         return
-    
-    # Connect to the SQLite database
-    conn = sqlite3.connect('slot_booking_new.db')
-    # Update the database with the file data
-    df.to_sql('appointment_bookings', conn, if_exists='replace', index=False)
-    conn.close()
+
+    # Stream the file into a staging table that replaces the old one only once it is complete
+    # Replacing the table drops its indexes; the unique (date, spoc) index is restored in
+    # the transaction that swaps the new table in
+    replace_table_from_upload(file, 'slot_booking_new.db', 'appointment_bookings', finish=ensure_bookings_schema)
     st.success('slot_booking_new.db updated successfully with uploaded data.')
 
+# The replaced table has pandas' column types and no indexes; restore the shared layout
+# in the transaction that swaps it in, so a failure keeps the old table
+def restore_studentcap_layout(conn):
+    unify_student_table(conn, 'studentcap')
+    ensure_student_indexes(conn, 'studentcap')
+
 # Function to upload and update duplicate.db with CSV or Excel data
 def upload_duplicate(file):
     file_extension = file.name.split('.')[-1]
-    
-    # Read the file based on its extension
-    if file_extension == 'csv':
-        df = pd.read_csv(file)
-    elif file_extension in ['xls', 'xlsx']:
-        df = pd.read_excel(file)
-    else:
+    if file_extension not in ['csv', 'xls', 'xlsx']:
         st.error("Unsupported file format")
         return
-    
-    # Connect to the SQLite database
-    conn = sqlite3.connect('duplicate.db')
-    # Update the database with the file data
-    df.to_sql('studentcap', conn, if_exists='replace', index=False)
-    conn.close()
+
+    # Stream the file into a staging table that replaces the old one only once it is complete
+    replace_table_from_upload(file, 'duplicate.db', 'studentcap', finish=restore_studentcap_layout)
     st.success('duplicate.db updated successfully with uploaded data.')
 
 # Function to view data from slot_booking_new.db
 def view_slot_booking_data():
-    conn = sqlite3.connect('slot_booking_new.db')
-    df = pd.read_sql_query("SELECT * FROM appointment_bookings", conn)
-    conn.close()
+    with connection('slot_booking_new.db') as conn:
+        df = pd.read_sql_query("SELECT * FROM appointment_bookings", conn)
     st.dataframe(df)
 
 # Function to view data from duplicate.db
 def view_duplicate_data():
-    conn = sqlite3.connect('duplicate.db')
-    df = pd.read_sql_query("SELECT * FROM studentcap", conn)
-    conn.close()
+    with connection('duplicate.db') as conn:
+        df = pd.read_sql_query("SELECT * FROM studentcap", conn)
     st.dataframe(df)
 
-# Function to export data from slot_booking_new.db to CSV
-def export_slot_booking_to_csv():
-    conn = sqlite3.connect('slot_booking_new.db')
-    df = pd.read_sql_query("SELECT * FROM appointment_bookings", conn)
-    conn.close()
-    return df.to_csv(index=False)
+# Function to export data from slot_booking_new.db to a CSV file (runs in the export worker)
+def export_slot_booking_to_csv(path):
+    with open(path, 'wb') as out:
+        write_csv(out, 'slot_booking_new.db', "SELECT * FROM appointment_bookings")
 
-# Function to export data from duplicate.db to CSV
-def export_duplicate_to_csv():
-    conn = sqlite3.connect('duplicate.db')
-    df = pd.read_sql_query("SELECT * FROM studentcap", conn)
-    conn.close()
-    return df.to_csv(index=False)
+# Function to export data from duplicate.db to a CSV file (runs in the export worker)
+def export_duplicate_to_csv(path):
+    with open(path, 'wb') as out:
+        write_csv(out, 'duplicate.db', "SELECT * FROM studentcap")
 
 # Main function for the Streamlit app
 def main():
@@ -94,25 +85,12 @@ def main():
 
     st.header('Export Data to CSV')
 
-    slot_booking_csv = st.button('Export slot_booking_new.db to CSV')
-    if slot_booking_csv:
-        csv_data = export_slot_booking_to_csv()
-        st.download_button(
-            label="Download slot_booking_new.csv",
-            data=csv_data,
-            file_name="slot_booking_new.csv",
-            mime="text/csv"
-        )
-
-    duplicate_csv = st.button('Export duplicate.db to CSV')
-    if duplicate_csv:
-        csv_data = export_duplicate_to_csv()
-        st.download_button(
-            label="Download duplicate.csv",
-            data=csv_data,
-            file_name="duplicate.csv",
-            mime="text/csv"
-        )
+    # Exports are built in the background and reused until the database changes
+    export_download('Export slot_booking_new.db to CSV', 'slot_booking_new', data_version('slot_booking_new.db'),
+                    export_slot_booking_to_csv, "Download slot_booking_new.csv", "slot_booking_new.csv", "text/csv")
+
+    export_download('Export duplicate.db to CSV', 'duplicate', data_version('duplicate.db'),
+                    export_duplicate_to_csv, "Download duplicate.csv", "duplicate.csv", "text/csv")
 
 # Run the app
 if __name__ == '__main__':
@@ -0,0 +1,199 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from db import connection
+
+JOBS_DB = 'upload_jobs.db'
+UPLOAD_DIR = os.path.join(tempfile.gettempdir(), 'slbook_uploads')
+MAX_WORKERS = 2
+POLL_SECONDS = 1
+# A server touches its unfinished jobs this often; one silent for STALE_SECONDS has lost its server
+HEARTBEAT_SECONDS = 10
+STALE_SECONDS = 60
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='upload')
+
+# Identifies this server process in upload_jobs.owner; several apps may share JOBS_DB
+_OWNER = uuid.uuid4().hex
+_heartbeat_started = False
+_heartbeat_lock = threading.Lock()
+
+
+def _ensure_schema(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS upload_jobs
+                    (id TEXT PRIMARY KEY,
+                    file_name TEXT,
+                    target TEXT,
+                    status TEXT,
+                    rows_read INTEGER DEFAULT 0,
+                    rows_inserted INTEGER DEFAULT 0,
+                    rows_rejected INTEGER DEFAULT 0,
+                    error TEXT,
+                    created_at REAL,
+                    updated_at REAL,
+                    owner TEXT)''')
+    if 'owner' not in {row[1] for row in conn.execute('PRAGMA table_info(upload_jobs)')}:
+        conn.execute('ALTER TABLE upload_jobs ADD COLUMN owner TEXT')
+
+
+def _update_job(job_id, **fields):
+    fields['updated_at'] = time.time()
+    assignments = ', '.join(f'{name} = ?' for name in fields)
+    with connection(JOBS_DB) as conn:
+        conn.execute(f'UPDATE upload_jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+
+def _expire_orphaned_jobs():
+    """Mark unfinished jobs whose server stopped touching them as interrupted."""
+    with connection(JOBS_DB) as conn:
+        conn.execute('''UPDATE upload_jobs SET status = 'interrupted'
+                        WHERE status IN ('queued', 'running') AND owner IS NOT ? AND updated_at < ?''',
+                     (_OWNER, time.time() - STALE_SECONDS))
+
+
+def _heartbeat():
+    while True:
+        time.sleep(HEARTBEAT_SECONDS)
+        with connection(JOBS_DB) as conn:
+            conn.execute("UPDATE upload_jobs SET updated_at = ? WHERE owner = ? AND status IN ('queued', 'running')",
+                         (time.time(), _OWNER))
+
+
+def _start_heartbeat():
+    global _heartbeat_started
+    with _heartbeat_lock:
+        if not _heartbeat_started:
+            threading.Thread(target=_heartbeat, name='upload-heartbeat', daemon=True).start()
+            _heartbeat_started = True
+
+
+# Jobs left behind by a server that has stopped will never finish; those of servers still
+# running (they keep touching updated_at) are left alone
+with connection(JOBS_DB) as _conn:
+    _ensure_schema(_conn)
+_expire_orphaned_jobs()
+
+
+# Job id -> (store, keep) of jobs started by this process, so a failed one can be resumed
+_job_targets = {}
+
+
+def _upload_path(job_id, file_name):
+    return os.path.join(UPLOAD_DIR, job_id + os.path.splitext(file_name)[1].lower())
+
+
+def _run_upload(job_id, path, store, keep, skip_rows=0):
+    _update_job(job_id, status='running')
+
+    def report(rows_read, rows_inserted):
+        # Every row that passes the filter is inserted, so the rest were rejected by it
+        _update_job(job_id, rows_read=rows_read, rows_inserted=rows_inserted, rows_rejected=rows_read - rows_inserted)
+
+    try:
+        with open(path, 'rb') as f:
+            store.ingest(f, keep=keep, progress=report, skip_rows=skip_rows)
+    except Exception as exc:
+        # The file is kept so resume_upload() can pick up after the last stored batch
+        _update_job(job_id, status='failed', error=str(exc))
+        return
+    _update_job(job_id, status='done')
+    _job_targets.pop(job_id, None)
+    os.remove(path)
+
+
+def submit_upload(file, store, keep=None):
+    """Queue an uploaded file for background ingestion into `store` (see storage.py); return the job id.
+
+    The upload is copied to disk first, so the job outlives the session that started it.
+    """
+    job_id = uuid.uuid4().hex
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = _upload_path(job_id, file.name)
+    with open(path, 'wb') as f:
+        f.write(file.getbuffer())
+
+    now = time.time()
+    with connection(JOBS_DB) as conn:
+        conn.execute('INSERT INTO upload_jobs (id, file_name, target, status, created_at, updated_at, owner) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     (job_id, file.name, store.target, 'queued', now, now, _OWNER))
+    _job_targets[job_id] = (store, keep)
+    _start_heartbeat()
+    _executor.submit(_run_upload, job_id, path, store, keep)
+    return job_id
+
+
+def can_resume(job_id, file_name):
+    return job_id in _job_targets and os.path.exists(_upload_path(job_id, file_name))
+
+
+def resume_upload(job_id):
+    """Run a failed job again from its first unstored row."""
+    job = job_status(job_id)
+    store, keep = _job_targets[job_id]
+    _update_job(job_id, status='queued', error=None)
+    _executor.submit(_run_upload, job_id, _upload_path(job_id, job['file_name']), store, keep, job['rows_inserted'])
+
+
+def job_status(job_id):
+    with connection(JOBS_DB) as conn:
+        row = conn.execute('''SELECT file_name, status, rows_read, rows_inserted, rows_rejected, error, updated_at
+                              FROM upload_jobs WHERE id = ?''', (job_id,)).fetchone()
+    if row is None:
+        return None
+    keys = ('file_name', 'status', 'rows_read', 'rows_inserted', 'rows_rejected', 'error', 'updated_at')
+    return dict(zip(keys, row))
+
+
+@st.experimental_fragment(run_every=POLL_SECONDS)
+def _poll_upload(job_id):
+    job = job_status(job_id)
+    if job is not None and time.time() - job['updated_at'] > STALE_SECONDS:
+        # Its server may be gone; the job is marked interrupted if so
+        _expire_orphaned_jobs()
+        job = job_status(job_id)
+    if job is None or job['status'] not in ('queued', 'running'):
+        st.rerun()
+    st.info(f"Processing {job['file_name']}: {job['rows_read']} rows read, {job['rows_inserted']} inserted, "
+            f"{job['rows_rejected']} rejected so far...")
+
+
+def show_upload_progress():
+    """Show the status of the upload job named in the URL, polling while it runs.
+
+    The job id lives in the query string, so a browser refresh picks the progress back up.
+    """
+    job_id = st.query_params.get('upload_job')
+    if not job_id:
+        return
+    job = job_status(job_id)
+    if job is None:
+        return
+
+    if job['status'] in ('queued', 'running'):
+        _poll_upload(job_id)
+        return
+
+    if job['status'] == 'done' and job['rows_inserted'] == 0:
+        st.error(f"No valid records found in {job['file_name']}.")
+    elif job['status'] == 'done':
+        # Booking pages only allow booking once student data has been uploaded
+        st.session_state['data_uploaded'] = True
+        st.success(f"{job['file_name']}: {job['rows_inserted']} valid records inserted successfully "
+                   f"({job['rows_read']} read, {job['rows_rejected']} rejected).")
+    elif job['status'] == 'failed':
+        st.error(f"Upload of {job['file_name']} failed after {job['rows_inserted']} records: {job['error']}")
+        if can_resume(job_id, job['file_name']) and st.button('Resume Upload'):
+            resume_upload(job_id)
+            st.rerun()
+    else:
+        st.warning(f"Upload of {job['file_name']} was interrupted by a server restart after "
+                   f"{job['rows_inserted']} records. Please upload the remaining rows again.")
+    if st.button('Dismiss upload status'):
+        del st.query_params['upload_job']
+        st.rerun()
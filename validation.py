@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from db import connection
+from metrics import span
+
+IDS_FILE = 'ids.xlsx'
+INDEX_DB = 'ids_index.db'   # compiled copy of ids.xlsx, rebuilt only when the workbook changes
+
+
+def clean_id_series(series):
+    return series.astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _ensure_index_schema(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS id_sources
+                    (source TEXT PRIMARY KEY,
+                    signature TEXT,
+                    sha256 TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS valid_ids
+                    (source TEXT,
+                    cmis_id TEXT,
+                    PRIMARY KEY (source, cmis_id)) WITHOUT ROWID''')
+
+
+def _compile_index(conn, path, signature):
+    """Bring the stored ID list for `path` up to date and return it as a sorted array."""
+    _ensure_index_schema(conn)
+    stored = conn.execute('SELECT signature, sha256 FROM id_sources WHERE source = ?', (path,)).fetchone()
+
+    if stored is None or stored[0] != signature:
+        sha256 = _file_hash(path)
+        if stored is None or stored[1] != sha256:
+            with span('parse.ids_xlsx'):
+                ids_df = pd.read_excel(path, usecols=['CMIS_ID'])
+            ids = clean_id_series(ids_df['CMIS_ID'].dropna()).unique()
+            conn.execute('DELETE FROM valid_ids WHERE source = ?', (path,))
+            conn.executemany('INSERT OR IGNORE INTO valid_ids (source, cmis_id) VALUES (?, ?)',
+                             ((path, cmis_id) for cmis_id in ids))
+        # A touched but unchanged workbook only needs its signature refreshed
+        conn.execute('INSERT OR REPLACE INTO id_sources (source, signature, sha256) VALUES (?, ?, ?)',
+                     (path, signature, sha256))
+
+    rows = conn.execute('SELECT cmis_id FROM valid_ids WHERE source = ? ORDER BY cmis_id', (path,)).fetchall()
+    return np.array([row[0] for row in rows], dtype=object)
+
+
+# path -> (signature, ids); a process-wide dict rather than st.cache_resource so upload
+# workers can validate off the script thread. A changed ids.xlsx replaces its entry.
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def valid_ids(path=IDS_FILE):
+    """Return the normalized CMIS IDs from ids.xlsx as a sorted array."""
+    signature = _file_signature(path)
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != signature:
+            with connection(INDEX_DB) as conn:
+                cached = _loaded[path] = (signature, _compile_index(conn, path, signature))
+    return cached[1]
+
+
+def valid_id_mask(series, path=IDS_FILE):
+    """Boolean mask of the entries of `series` whose normalized ID appears in ids.xlsx."""
+    return clean_id_series(series).isin(valid_ids(path))
+
+
+def keep_valid_rows(batch, path=IDS_FILE):
+    """The rows of an upload batch whose 'CMIS ID' appears in ids.xlsx, with the IDs normalized."""
+    batch['CMIS ID'] = clean_id_series(batch['CMIS ID'])
+    return batch[valid_id_mask(batch['CMIS ID'], path)]